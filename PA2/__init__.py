@@ -0,0 +1,5 @@
+"""
+The Thalassians and Voridians transport puzzle (q1) and its parameter sweep (sweep).
+
+Run the programs from the top of the repo, e.g. python -m PA2.q1
+"""
@@ -5,9 +5,22 @@ This script is used to solve a variation of the Missionaries and Cannibals puzzl
 It finds a valid way to transport 3 Timid Thalassians and 3 Vile Voridians from their
 imploding planet Xylophus to the safer planet Zenithia, without violating the safety
 constratints of the Voridians never outnumbering the Thalassians on either side.
+
+The functions below solve the original 3 + 3 puzzle with a two seat spaceship.
+The Transport class solves it for any number of Thalassians, Voridians and seats.
 """
 
-from collections import deque
+import argparse
+import os
+import sys
+
+if __package__ in (None, ""):
+    # started as a script (python PA2/q1.py) instead of with python -m: the packages
+    # and the shared modules live at the top of the repo
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frontier_search import frontier_bfs
+from search_stats import SearchStats
 
 
 def is_valid(thal_left: int, vors_left: int) -> bool:
@@ -118,12 +131,53 @@ def valid_moves(state: tuple) -> list:
     return next_states
 
 
-def bfs(start_state: tuple, goal_state: tuple) -> list | None:
+def path_from_parents(parents: dict, state: tuple) -> list:
+    """
+    Rebuild the path from the start to a state by following the parents
+
+    Args:
+        parents (dict): state -> previous state, None for the start
+        state (tuple): The state the path ends at
+
+    Returns:
+        list: The states from the start to the given state
+    """
+    path = []
+
+    while state is not None:
+        path.append(state)
+        state = parents[state]
+
+    return list(reversed(path))
+
+
+def bfs(start_state: tuple, goal_state: tuple, stats: SearchStats | None = None) -> list | None:
     """
     Breadth First Search algorithm
     Takes the start state and goal and finds the best way
     to transprot all 6 people to the new planet.
 
+    Args:
+        start_state (tuple): The starting state of the system
+        goal_state (tuple): The target state
+
+        stats (SearchStats): If given, it is filled in with the counters and timers of the search
+
+    Return:
+        list: The shortest path from the starting state to the goal state
+              as a list or None if no solution is found
+    """
+
+    return Transport().solve(start_state, goal_state, stats=stats)
+
+
+def bidirectional_bfs(start_state: tuple, goal_state: tuple) -> list | None:
+    """
+    Breadth First Search from the start and the goal at the same time.
+    Every transport can be undone by flying the same people back, so the
+    goal side uses valid_moves too. Each step expands a whole layer of the
+    smaller side and the first state reached by both sides gives a shortest path.
+
     Args:
         start_state (tuple): The starting state of the system
         goal_state (tuple): The target state
@@ -133,34 +187,341 @@ def bfs(start_state: tuple, goal_state: tuple) -> list | None:
               as a list or None if no solution is found
     """
 
-    visited = set()
-    fringe = deque()
-    fringe.append((start_state, [start_state])) # fringe(starting state, path so far)
+    # the same check as Transport.solve: nobody can be in an unsafe state, not even at the ends
+    if not (is_valid(start_state[0], start_state[1]) and is_valid(goal_state[0], goal_state[1])):
+        return None
+
+    if start_state == goal_state:
+        return [start_state]
+
+    forward = {start_state: None}   # state -> previous state from the start
+    backward = {goal_state: None}   # state -> next state towards the goal
+    forward_fringe = [start_state]
+    backward_fringe = [goal_state]
+    meeting = None
+
+    while forward_fringe and backward_fringe and meeting is None:
+        # expand the smaller side
+        if len(forward_fringe) <= len(backward_fringe):
+            fringe, parents, other_parents = forward_fringe, forward, backward
+        else:
+            fringe, parents, other_parents = backward_fringe, backward, forward
+
+        next_fringe = []
+        for current_state in fringe:
+            for next_state in valid_moves(current_state):
+                if next_state in parents:
+                    continue
+
+                parents[next_state] = current_state
+                if next_state in other_parents:
+                    meeting = next_state
+                    break
+                next_fringe.append(next_state)
+
+            if meeting is not None:
+                break
+
+        if parents is forward:
+            forward_fringe = next_fringe
+        else:
+            backward_fringe = next_fringe
+
+    if meeting is None:
+        return None
+
+    # from the start to the meeting state
+    path = path_from_parents(forward, meeting)
+
+    # from the meeting state to the goal
+    current_state = backward[meeting]
+    while current_state is not None:
+        path.append(current_state)
+        current_state = backward[current_state]
+
+    return path
+
+
+class Transport:
+    """
+    The puzzle for any number of Thalassians and Voridians and any spaceship capacity.
+
+    A state is encoded as one integer, (thal_left * (voridians + 1) + vors_left) * 2 + side,
+    where side is 0 if the spaceship is on Xylophus and 1 if it is on Zenithia,
+    so the search can keep its visited states and parents in flat arrays.
 
-    while fringe:
-        # save the current state and the path so far
-        current_state, path = fringe.popleft()
+    Args:
+        thalassians (int): Number of Thalassians
+        voridians (int): Number of Voridians
+        capacity (int): Number of seats in the spaceship
+        valid (bytearray): The table made by valid_states, if it was already made
+                           for the same number of Thalassians and Voridians
+    """
 
-        # check if we're done
-        if current_state == goal_state:
-            return path
-        
-        # if we've done the same transport again, keep going
-        if current_state in visited:
-            continue
+    def __init__(self, thalassians: int = 3, voridians: int = 3, capacity: int = 2,
+                 valid: bytearray | None = None) -> None:
+        self.thalassians = thalassians
+        self.voridians = voridians
+        self.capacity = capacity
+        self.num_states = (thalassians + 1) * (voridians + 1) * 2
+        self.valid = valid if valid is not None else self.valid_states()
+
+        # every way to fill the spaceship, made once for the whole search
+        self.passengers = [
+            (thal_in_ss, vors_in_ss)
+            for thal_in_ss in range(min(capacity, thalassians) + 1)
+            for vors_in_ss in range(min(capacity - thal_in_ss, voridians) + 1)
+            if thal_in_ss + vors_in_ss > 0
+        ]
+
+    def encode(self, state: tuple) -> int:
+        """
+        Turn a (thal_left, vors_left, spaceship_location) state into an integer
+
+        Args:
+            state (tuple): The state, like (3, 3, 'L')
+
+        Returns:
+            int: The encoded state
+        """
+        thal_left, vors_left, ss_loc = state
+
+        return (thal_left * (self.voridians + 1) + vors_left) * 2 + (ss_loc == 'R')
+
+    def decode(self, code: int) -> tuple:
+        """
+        Turn an encoded state back into a (thal_left, vors_left, spaceship_location) state
+
+        Args:
+            code (int): The encoded state
+
+        Returns:
+            tuple: The state, like (3, 3, 'L')
+        """
+        people, side = divmod(code, 2)
+        thal_left, vors_left = divmod(people, self.voridians + 1)
+
+        return (thal_left, vors_left, 'R' if side else 'L')
+
+    def is_valid(self, thal_left: int, vors_left: int) -> bool:
+        """
+        Checks whether a state is valid.
+
+        Args:
+            thal_left (int): Number of Thalassians on Xylophus
+            vors_left (int): Number of Voridians on Xylophus
+
+        Returns:
+            bool: True if the state is valid, else False
+        """
+        thal_right = self.thalassians - thal_left
+        vors_right = self.voridians - vors_left
+
+        if not (0 <= thal_left <= self.thalassians and 0 <= vors_left <= self.voridians):
+            return False
+        if thal_left > 0 and thal_left < vors_left:
+            return False
+        if thal_right > 0 and thal_right < vors_right:
+            return False
+
+        return True
+
+    def valid_states(self) -> bytearray:
+        """
+        Check every (thal_left, vors_left) once. The result does not depend on
+        the capacity, so it can be shared by instances with other capacities.
+
+        Returns:
+            bytearray: 1 at thal_left * (voridians + 1) + vors_left if the state is valid, else 0
+        """
+        return bytearray(
+            self.is_valid(thal_left, vors_left)
+            for thal_left in range(self.thalassians + 1)
+            for vors_left in range(self.voridians + 1)
+        )
+
+    def successors(self, code: int) -> list:
+        """
+        The encoded states that can be reached with one trip of the spaceship
+
+        Args:
+            code (int): The encoded current state
+
+        Returns:
+            list: A list of (index of the load in passengers, encoded state) pairs
+        """
+        people, side = divmod(code, 2)
+        thal_left, vors_left = divmod(people, self.voridians + 1)
+
+        # the people fly away from the side the spaceship is on
+        direction = -1 if side == 0 else 1
+        thalassians, voridians, valid = self.thalassians, self.voridians, self.valid
+        next_states = []
+
+        for load, (thal_in_ss, vors_in_ss) in enumerate(self.passengers):
+            new_thal_left = thal_left + direction * thal_in_ss
+            new_vors_left = vors_left + direction * vors_in_ss
+
+            if not (0 <= new_thal_left <= thalassians and 0 <= new_vors_left <= voridians):
+                continue
+
+            people = new_thal_left * (voridians + 1) + new_vors_left
+            if valid[people]:
+                next_states.append((load, people * 2 + 1 - side))
+
+        return next_states
+
+    def solve(self, start_state: tuple | None = None, goal_state: tuple | None = None,
+              workers: int = 1, stats: SearchStats | None = None) -> list | None:
+        """
+        Breadth First Search over the encoded states with frontier_search.
+        Takes everyone from Xylophus to Zenithia unless other states are given.
+
+        Args:
+            start_state (tuple): The starting state, everyone on Xylophus by default
+            goal_state (tuple): The target state, everyone on Zenithia by default
+            workers (int): Number of processes that expand the big layers
+            stats (SearchStats): If given, it is filled in with the counters and timers of the search
+
+        Returns:
+            list: The shortest path from the starting state to the goal state
+                  as a list or None if no solution is found
+        """
+        if start_state is None:
+            start_state = (self.thalassians, self.voridians, 'L')
+        if goal_state is None:
+            goal_state = (0, 0, 'R')
+
+        # e.g. more Voridians than Thalassians in total: nobody can even start
+        if not (self.valid[self.encode(start_state) // 2] and self.valid[self.encode(goal_state) // 2]):
+            if stats is not None:
+                stats.finish()
+            return None
+
+        result = frontier_bfs(TransportProblem(self, goal_state), start_state, workers=workers,
+                              stats=stats)
+
+        if result is None:
+            return None
+
+        return [state for _, state in result]
+
+    def solve_layers(self, start_state: tuple | None = None, goal_state: tuple | None = None) -> list | None:
+        """
+        Breadth First Search that expands a whole layer at once with NumPy
+        (needs NumPy to be installed). The layer is an array of encoded states,
+        every spaceship load is applied to all of them with broadcasting, the
+        invalid ones are dropped with boolean masks and the ones already seen
+        with a visited bitmap. It finds the same number of crossings as solve,
+        and is much faster when the layers hold many states.
+
+        Args:
+            start_state (tuple): The starting state, everyone on Xylophus by default
+            goal_state (tuple): The target state, everyone on Zenithia by default
+
+        Returns:
+            list: The shortest path from the starting state to the goal state
+                  as a list or None if no solution is found
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("solve_layers needs NumPy, install it with: pip install numpy") from None
+
+        if start_state is None:
+            start_state = (self.thalassians, self.voridians, 'L')
+        if goal_state is None:
+            goal_state = (0, 0, 'R')
+
+        start = self.encode(start_state)
+        goal = self.encode(goal_state)
+
+        if not (self.valid[start // 2] and self.valid[goal // 2]):
+            return None
+
+        valid = np.frombuffer(bytes(self.valid), dtype=np.uint8).astype(bool)
+        loads = np.array(self.passengers, dtype=np.int64).reshape(-1, 2)
+        visited = np.zeros(self.num_states, dtype=bool)
+        parents = np.full(self.num_states, -1, dtype=np.int64)
+
+        visited[start] = True
+        frontier = np.array([start], dtype=np.int64)
+
+        while frontier.size and not visited[goal]:
+            people, side = np.divmod(frontier, 2)
+            thal_left, vors_left = np.divmod(people, self.voridians + 1)
+            direction = np.where(side == 0, -1, 1)[:, None]
+
+            # one row per state of the layer, one column per spaceship load
+            new_thal_left = thal_left[:, None] + direction * loads[:, 0]
+            new_vors_left = vors_left[:, None] + direction * loads[:, 1]
+
+            inside = (new_thal_left >= 0) & (new_thal_left <= self.thalassians) \
+                & (new_vors_left >= 0) & (new_vors_left <= self.voridians)
+            new_people = np.where(inside, new_thal_left * (self.voridians + 1) + new_vors_left, 0)
+            keep = inside & valid[new_people]
+
+            new_states = (new_people * 2 + 1 - side[:, None])[keep]
+            from_states = np.broadcast_to(frontier[:, None], keep.shape)[keep]
+
+            # drop the states already seen and keep one parent for each new state
+            unseen = ~visited[new_states]
+            new_states, first = np.unique(new_states[unseen], return_index=True)
+            visited[new_states] = True
+            parents[new_states] = from_states[unseen][first]
+            frontier = new_states
+
+        if not visited[goal]:
+            return None
+
+        path = [goal]
+        while path[-1] != start:
+            path.append(int(parents[path[-1]]))
+
+        return [self.decode(code) for code in reversed(path)]
+
+
+class TransportProblem:
+    """
+    A Transport and a goal state as a problem for frontier_search.frontier_bfs
 
-        visited.add(current_state)
+    Args:
+        transport (Transport): The puzzle
+        goal_state (tuple): The target state
+    """
 
-        for next_state in valid_moves(current_state):
-            if next_state not in visited:
-                fringe.append((next_state, path+[next_state]))
+    def __init__(self, transport: Transport, goal_state: tuple) -> None:
+        self.transport = transport
+        self.goal = transport.encode(goal_state)
+        self.num_states = transport.num_states
+        self.actions = transport.passengers
+        self.encode = transport.encode
+        self.decode = transport.decode
+        self.successors = transport.successors
 
-    return None
+    def is_goal(self, code: int) -> bool:
+        return code == self.goal
 
 
 def main() -> None:
 
-    result = bfs((3, 3, 'L'), (0, 0, 'R'))
+    parser = argparse.ArgumentParser(description="Transport the Thalassians and Voridians to Zenithia")
+    parser.add_argument("--thalassians", type=int, default=3)
+    parser.add_argument("--voridians", type=int, default=3)
+    parser.add_argument("--capacity", type=int, default=2, help="seats in the spaceship")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="expand a whole BFS layer at once with NumPy")
+    parser.add_argument("--stats", metavar="FILE", help="append the stats of the search to FILE as a JSON line")
+    args = parser.parse_args()
+
+    stats = SearchStats("bfs", args.stats) if args.stats else None
+
+    if args.vectorized:
+        result = Transport(args.thalassians, args.voridians, args.capacity).solve_layers()
+    elif (args.thalassians, args.voridians, args.capacity) == (3, 3, 2):
+        result = bfs((3, 3, 'L'), (0, 0, 'R'), stats=stats)
+    else:
+        result = Transport(args.thalassians, args.voridians, args.capacity).solve(stats=stats)
 
     if result == None:
         print("No solutions")
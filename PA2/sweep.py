@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+"""
+This script finds, for a whole grid of (Thalassians, Voridians, capacity)
+configurations of the puzzle in q1.py, whether everyone can be transported
+to Zenithia and the minimum number of crossings, and writes it as CSV.
+
+Instead of calling the solver once per configuration from scratch, the sweep:
+*resolves the configurations that have a closed form without searching
+*searches all the capacities of the same groups in one Breadth First Search (see shared_bfs):
+ every state keeps a bitmask of the capacities that reached it, so the states
+ and the valid state table are shared and every state is expanded once per layer
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+if __package__ in (None, ""):
+    # started as a script (python PA2/sweep.py) instead of with python -m: the packages
+    # and the shared modules live at the top of the repo
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PA2.q1 import Transport
+
+UNSOLVABLE = -1 # number of crossings written for configurations with no solution
+
+
+def closed_form(thalassians: int, voridians: int, capacity: int) -> int | None:
+    """
+    Minimum number of crossings of the configurations that don't need a search
+
+    Args:
+        thalassians (int): Number of Thalassians
+        voridians (int): Number of Voridians
+        capacity (int): Number of seats in the spaceship
+
+    Returns:
+        int: The number of crossings (UNSOLVABLE if there is no solution)
+             or None if the configuration needs a search
+    """
+    people = thalassians + voridians
+
+    # nobody can fly the spaceship to Zenithia, so the goal (spaceship on Zenithia)
+    # is never reached. Transport.solve gives None too, and the table follows the solver
+    if people == 0:
+        return UNSOLVABLE
+    # the Voridians outnumber the Thalassians before anyone moves
+    if 0 < thalassians < voridians:
+        return UNSOLVABLE
+    # everyone fits in the spaceship
+    if capacity >= people:
+        return 1
+    if capacity <= 1:   # someone has to fly the spaceship back, so nobody ever stays
+        return UNSOLVABLE
+    # only one kind of people, nobody can be outnumbered. Every round trip
+    # leaves capacity - 1 people on Zenithia, then the last trip takes capacity
+    if thalassians == 0 or voridians == 0:
+        round_trips = -(-(people - capacity) // (capacity - 1))
+        return 2 * round_trips + 1
+
+    return None
+
+
+def shared_bfs(thalassians: int, voridians: int, capacities: list) -> dict:
+    """
+    Minimum number of crossings for several capacities of the same groups, in one search.
+    A bigger spaceship can fly every load a smaller one can, so the searches of all the
+    capacities run in lockstep: a state of a layer carries the bitmask of the capacities
+    that first reach it at that depth, and a load only passes on the bits of the
+    capacities it fits in. Every capacity stops spreading once it reached the goal.
+
+    Args:
+        thalassians (int): Number of Thalassians
+        voridians (int): Number of Voridians
+        capacities (list): The capacities of the spaceship
+
+    Returns:
+        dict: capacity -> number of crossings, UNSOLVABLE if there is no solution
+    """
+    results = {capacity: UNSOLVABLE for capacity in capacities}
+    if not capacities:
+        return results
+
+    transport = Transport(thalassians, voridians, max(capacities))
+    bits = {capacity: 1 << i for i, capacity in enumerate(capacities)}
+    # the loads from the smallest up, with the capacities each one fits in: the bits of a load
+    # are a subset of the bits of every smaller one, so the first load with none left ends the list
+    loads = [
+        (thal_in_ss, vors_in_ss,
+         sum(bit for capacity, bit in bits.items() if capacity >= thal_in_ss + vors_in_ss))
+        for thal_in_ss, vors_in_ss in sorted(transport.passengers, key=sum)
+    ]
+
+    start = transport.encode((thalassians, voridians, 'L'))
+    goal = transport.encode((0, 0, 'R'))
+    valid = transport.valid
+    if not (valid[start // 2] and valid[goal // 2]):
+        return results
+
+    unsolved = (1 << len(capacities)) - 1
+    seen = [0] * transport.num_states    # capacities that already reached each state
+    seen[start] = unsolved
+    layer = {start: unsolved}
+    depth = 0
+
+    while layer and unsolved:
+        next_layer = {}
+        for code, mask in layer.items():
+            mask &= unsolved
+            people, side = divmod(code, 2)
+            thal_left, vors_left = divmod(people, voridians + 1)
+            direction = -1 if side == 0 else 1  # the people fly away from the side the spaceship is on
+
+            for thal_in_ss, vors_in_ss, load_bits in loads:
+                fits = mask & load_bits
+                if not fits:
+                    break
+                new_thal_left = thal_left + direction * thal_in_ss
+                new_vors_left = vors_left + direction * vors_in_ss
+                if not (0 <= new_thal_left <= thalassians and 0 <= new_vors_left <= voridians):
+                    continue
+                new_people = new_thal_left * (voridians + 1) + new_vors_left
+                if not valid[new_people]:
+                    continue
+
+                next_code = new_people * 2 + 1 - side
+                new = fits & ~seen[next_code]
+                if new:
+                    seen[next_code] |= new
+                    next_layer[next_code] = next_layer.get(next_code, 0) | new
+
+        depth += 1
+        reached = next_layer.pop(goal, 0) & unsolved    # the goal is not expanded any further
+        for capacity, bit in bits.items():
+            if reached & bit:
+                results[capacity] = depth
+        unsolved &= ~reached
+        layer = next_layer
+
+    return results
+
+
+def sweep(thalassians_range, voridians_range, capacities) -> list:
+    """
+    Solve every configuration of the grid
+
+    Args:
+        thalassians_range: The numbers of Thalassians to try
+        voridians_range: The numbers of Voridians to try
+        capacities: The capacities of the spaceship to try
+
+    Returns:
+        list: A list of (thalassians, voridians, capacity, crossings) rows,
+              crossings is UNSOLVABLE if there is no solution
+    """
+    rows = []
+    capacities = sorted(capacities)
+
+    for thalassians in thalassians_range:
+        for voridians in voridians_range:
+            results = {capacity: closed_form(thalassians, voridians, capacity) for capacity in capacities}
+
+            # one search for all the capacities without a closed form
+            searched = [capacity for capacity in capacities if results[capacity] is None]
+            results.update(shared_bfs(thalassians, voridians, searched))
+
+            for capacity in capacities:
+                rows.append((thalassians, voridians, capacity, results[capacity]))
+
+    return rows
+
+
+def write_csv(rows: list, file) -> None:
+    """
+    Write the rows of sweep as CSV with a header
+
+    Args:
+        rows (list): The rows made by sweep
+        file: An open text file
+    """
+    writer = csv.writer(file)
+    writer.writerow(["thalassians", "voridians", "capacity", "crossings"])
+    writer.writerows(rows)
+
+
+def to_array(rows: list):
+    """
+    Put the rows of sweep in a NumPy array (needs NumPy to be installed)
+
+    Args:
+        rows (list): The rows made by sweep
+
+    Returns:
+        numpy.ndarray: An array of shape (len(rows), 4)
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("to_array needs NumPy, install it with: pip install numpy") from None
+
+    return np.array(rows, dtype=np.int64).reshape(-1, 4)
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Solve a grid of configurations of the puzzle in q1.py")
+    parser.add_argument("--max-thalassians", type=int, default=10)
+    parser.add_argument("--max-voridians", type=int, default=10)
+    parser.add_argument("--max-capacity", type=int, default=6)
+    parser.add_argument("--output", help="CSV file to write (default: stdout)")
+    parser.add_argument("--npy", help="also save the table as a NumPy .npy file")
+    args = parser.parse_args()
+
+    rows = sweep(range(args.max_thalassians + 1), range(args.max_voridians + 1),
+                 range(1, args.max_capacity + 1))
+
+    if args.output is None:
+        write_csv(rows, sys.stdout)
+    else:
+        with open(args.output, "w", newline="") as file:
+            write_csv(rows, file)
+
+    if args.npy is not None:
+        import numpy as np
+        np.save(args.npy, to_array(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Sliding tile puzzles: the 5-tile puzzle (bejleri_3_1) and the 8-puzzle (bejleri_3_2).
+
+Run the programs from the top of the repo, e.g. python -m bejleri_3.bejleri_3_1
+"""
@@ -1,9 +1,22 @@
 #! /usr/bin/env python
 
 from collections import deque
+from itertools import count
 import timeit
 import time
 import sys
+import os
+
+if __package__ in (None, ""):
+    # started as a script (python bejleri_3/bejleri_3_1.py) instead of with python -m: the packages
+    # and the shared modules live at the top of the repo
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bejleri_3.sliding_puzzle import is_solvable, INVERSE, rank_permutation, SlidingPuzzle, successor_table
+from bejleri_3.solution_cache import SolutionCache
+from bejleri_3.external_bfs import external_bfs, print_layer
+from frontier_search import frontier_bfs
+from search_stats import SearchStats
 
 """
 5-tile puzzle with BFS and IDS
@@ -24,6 +37,18 @@ There are 4 possible actions:
 *Right = R
 """
 
+WIDTH = 3   # number of columns on the board
+SIZE = 6    # number of cells on the board
+
+MOVES = "LRDU"  # a move is stored in the solution table as its index in this string
+GOAL = 254      # marks the goal in the solution table
+UNREACHED = 255 # marks a state that can't reach the goal in the solution table
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "table_cache")
+
+# the legal moves of every blank position and the cell of the tile each one slides,
+# computed once instead of on every call. The moves are in the order get_valid_move always had
+SUCCESSORS = successor_table(WIDTH, SIZE, "UDLR")
+
 
 def get_valid_move(state: list) -> list:
     """
@@ -36,19 +61,7 @@ def get_valid_move(state: list) -> list:
         list: A list with the 
     """
 
-    blank_tile = state.index(0)
-    moves = []
-
-    if blank_tile + 3 < 6:
-        moves.append('U')
-    if blank_tile - 3 >= 0:
-        moves.append('D')
-    if blank_tile % 3 != 2:
-        moves.append('L')
-    if blank_tile % 3 != 0:
-        moves.append('R')
-
-    return moves
+    return [move for move, _ in SUCCESSORS[state.index(0)]]
 
 
 def move_tile(state: list, action: str) -> list | None:
@@ -64,27 +77,39 @@ def move_tile(state: list, action: str) -> list | None:
     """
 
     blank_tile = state.index(0)
-    new_state = state.copy()    # create a copy so as to keep the current state the same
-
-    if action == 'U':
-        tile = blank_tile + 3
-    elif action == 'D':
-        tile = blank_tile - 3
-    elif action == 'L':
-        tile = blank_tile + 1
-    elif action == 'R':
-        tile = blank_tile - 1
-    else:
-        return None 
-    
-    # swap the blank tile with a normal tile
-    (new_state[tile], new_state[blank_tile]) = (new_state[blank_tile], new_state[tile])
 
-    return new_state
+    for move, tile in SUCCESSORS[blank_tile]:
+        if move == action:
+            new_state = state.copy()    # create a copy so as to keep the current state the same
+            # swap the blank tile with a normal tile
+            (new_state[tile], new_state[blank_tile]) = (new_state[blank_tile], new_state[tile])
+            return new_state
 
+    return None
 
 
-def bfs(initial_state: list, goal_state: list) -> list | None:
+
+def moves_taken(parents: dict, current_state: tuple) -> list:
+    """
+    Rebuild the moves from the root to a state by following the parents
+
+    Args:
+        parents (dict): state -> (previous state, action), None for the root
+        current_state (tuple): The state the path ends at
+
+    Returns:
+        list: A list with the moves taken
+    """
+    moves = []
+
+    while parents[current_state] is not None:
+        current_state, action = parents[current_state]
+        moves.append(action)
+
+    return list(reversed(moves))
+
+
+def bfs(initial_state: list, goal_state: list, stats: SearchStats | None = None) -> list | None:
     """
     Implementation of BFS. Takes the initial and the goal configuration
     of the board and finds the best way to reach the goal configuration.
@@ -92,39 +117,199 @@ def bfs(initial_state: list, goal_state: list) -> list | None:
     Args:
         initial_state (list): The initial configuration of the board
         goal_state (list): The goal configuration of the board
+        stats (SearchStats): If given, it is filled in with the counters and timers of the search
 
     Returns:
         list: The shortest path from the initial configuration to the
               goal configuration as a list or None if no solution is found
     """
 
-    visited = set() # holds the visisted nodes
-    fringe = deque()    # holds the nodes to be explored
-    fringe.append((initial_state, []))   # (initial configuration, path so far). Path so far starts empty
-    visited.add(tuple(initial_state))
+    # don't search at all if the goal can't be reached
+    if not is_solvable(initial_state, goal_state, WIDTH):
+        if stats is not None:
+            stats.finish()
+        return None
 
-    while fringe:
-        # save the current state and path
-        current_state, path = fringe.popleft()
+    # the boards are numbered 0-719 so the search keeps them in flat arrays,
+    # the moves are tried in the same order as get_valid_move
+    result = frontier_bfs(SlidingPuzzle(goal_state, WIDTH, move_order="UDLR"), initial_state,
+                          stats=stats)
 
-        # check if goal is reached
-        if current_state == goal_state:
-            return path
-        
-        # # if current state has been repeated, keep going
-        # if tuple(current_state) in visited:
-        #     continue
+    if result is None:
+        return None
+
+    return [action for action, _ in result[1:]]
+
+def expand_layer(fringe: list, parents: dict, other_parents: dict, backward: bool) -> tuple:
+    """
+    Helper for the bidirectional BFS. Expands every state of one layer
+    and stops as soon as a new state has already been reached by the other side.
+
+    Args:
+        fringe (list): The states of the layer to expand (as tuples)
+        parents (dict): state -> (neighbor state, action) for this side
+        other_parents (dict): The parents of the other side
+        backward (bool): True if this is the side that started from the goal
+
+    Returns:
+        tuple: (the next layer, the state where both sides met or None)
+    """
+    next_fringe = []
+
+    for current_state in fringe:
+        for action in get_valid_move(list(current_state)):
+            new_state = tuple(move_tile(list(current_state), action))
+            if new_state in parents:
+                continue
+
+            # the backward side stores the action that goes from new_state
+            # towards the goal, which is the inverse of the one applied here
+            if backward:
+                parents[new_state] = (current_state, INVERSE[action])
+            else:
+                parents[new_state] = (current_state, action)
+
+            if new_state in other_parents:
+                return next_fringe, new_state
+            next_fringe.append(new_state)
+
+    return next_fringe, None
+
+
+def bidirectional_bfs(initial_state: list, goal_state: list) -> list | None:
+    """
+    BFS from both the initial and the goal configuration at the same time.
+    The moves can be undone, so the goal side searches with the same moves.
+    Each step expands a whole layer of the smaller side, and the first state
+    reached by both sides gives a shortest path, like bfs.
+
+    Args:
+        initial_state (list): The initial configuration of the board
+        goal_state (list): The goal configuration of the board
+
+    Returns:
+        list: The shortest path from the initial configuration to the
+              goal configuration as a list or None if no solution is found
+    """
+
+    # don't search at all if the goal can't be reached
+    if not is_solvable(initial_state, goal_state, WIDTH):
+        return None
+
+    start = tuple(initial_state)
+    goal = tuple(goal_state)
+    if start == goal:
+        return []
+
+    forward = {start: None}     # state -> (previous state, action) from the start
+    backward = {goal: None}     # state -> (next state, action) towards the goal
+    forward_fringe = [start]
+    backward_fringe = [goal]
+    meeting = None
+
+    while forward_fringe and backward_fringe and meeting is None:
+        if len(forward_fringe) <= len(backward_fringe):
+            forward_fringe, meeting = expand_layer(forward_fringe, forward, backward, False)
+        else:
+            backward_fringe, meeting = expand_layer(backward_fringe, backward, forward, True)
+
+    if meeting is None:
+        return None
+
+    # moves from the start to the meeting state
+    path = moves_taken(forward, meeting)
+
+    # moves from the meeting state to the goal
+    current_state = meeting
+    while backward[current_state] is not None:
+        current_state, action = backward[current_state]
+        path.append(action)
+
+    return path
+
+
+def build_solution_table(goal_state: list) -> bytearray:
+    """
+    Solve every board for one goal with a single BFS backwards from the goal.
+    There are only 720 boards, so the table holds one byte per board
+    (indexed by rank_permutation) with the first move of a shortest path.
+
+    Args:
+        goal_state (list): The goal configuration of the board
+
+    Returns:
+        bytearray: The next move of every board, GOAL or UNREACHED
+    """
+    table = bytearray([UNREACHED]) * 720
+    table[rank_permutation(goal_state)] = GOAL
+    fringe = deque([goal_state])
+
+    while fringe:
+        current_state = fringe.popleft()
 
-        # check the valid moves for each action and put them in a new_state
         for action in get_valid_move(current_state):
             new_state = move_tile(current_state, action)
-            key = tuple(new_state)
-            if tuple(new_state) not in visited:
-                # visited.update(new_state)
-                visited.add(key)
-                fringe.append((new_state, path + [action]))
+            rank = rank_permutation(new_state)
+
+            # the way back from new_state to current_state is the inverse move
+            if table[rank] == UNREACHED:
+                table[rank] = MOVES.index(INVERSE[action])
+                fringe.append(new_state)
+
+    return table
+
+
+def load_solution_table(goal_state: list, cache_dir: str = TABLE_DIR) -> bytes:
+    """
+    Load the solution table of a goal from the disk, building and
+    saving it first if it is not there
+
+    Args:
+        goal_state (list): The goal configuration of the board
+        cache_dir (str): The folder the tables are kept in
+
+    Returns:
+        bytes: The table, like build_solution_table returns it
+    """
+    path = os.path.join(cache_dir, "table_" + "".join(map(str, goal_state)) + ".bin")
+
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # write to a temporary file first so another process never reads half a file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(build_solution_table(goal_state))
+        os.replace(temp_path, path)
+
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def table_solve(table: bytes, initial_state: list) -> list | None:
+    """
+    Find the shortest path by following the solution table, one lookup per move
+
+    Args:
+        table (bytes): The table of the goal, from build_solution_table or load_solution_table
+        initial_state (list): The initial configuration of the board
+
+    Returns:
+        list: The shortest path to the goal or None if no solution is found
+    """
+    path = []
+    state = initial_state
+
+    while True:
+        move = table[rank_permutation(state)]
+        if move == GOAL:
+            return path
+        if move == UNREACHED:
+            return None
+
+        path.append(MOVES[move])
+        state = move_tile(state, MOVES[move])
 
-    return None
 
 def progress_bar():
         for i in range(0, 101, 10):
@@ -147,44 +332,130 @@ def progress_bar():
             time.sleep(2)
 
 
-def dfs(initial_state: list, goal_state: list, depth_limit: int) -> list | None:
+def successors(state: tuple, blank_tile: int, last_action: str | None):
+    """
+    Generate the children of a board one at a time, without the move
+    that undoes last_action (it would only lead back to the parent)
+
+    Args:
+        state (tuple): The configuration of the board
+        blank_tile (int): The cell of the blank tile
+        last_action (str): The action that led to this board, None for the root
+
+    Yields:
+        tuple: (action, new state, new cell of the blank tile)
+    """
+    undo = INVERSE.get(last_action)
+
+    # in reverse, so the children come in the order the old stack of IDS popped them
+    for action, tile in reversed(SUCCESSORS[blank_tile]):
+        if action == undo:
+            continue
+        new_state = list(state)
+        new_state[blank_tile], new_state[tile] = state[tile], 0
+        yield action, tuple(new_state), tile
+
+
+def dfs(initial_state: list, goal_state: list, depth_limit: int,
+        stats: SearchStats | None = None) -> tuple:
     """
     Implementation of the DFS helper for IDS. Takes the initial and goal configuration
     of the board and find the best way to reach it.
 
+    A transposition table keeps the smallest depth at which each state was reached
+    in this iteration. A state is only expanded again if it is reached at a smaller
+    depth, so no shorter path is cut off (which a plain visited set would do) and the
+    table is dropped at the end of the iteration.
+
+    Every node on the stack holds a generator of its children, so a child is only
+    made when the search gets to it, and the move back to the parent is never made.
+
     Args:
         initial_state (list): The initial configuration of the board
         goal_state (list): The goal configuration of the board
         depth_limit (int): The depth limit as incremented by the IDS
+        stats (SearchStats): If given, the counters and timers of this iteration are added to it
 
     Returns:
-        list: Returns the path if the goal state is found, else None
+        tuple: (the path if the goal state is found else None, number of nodes generated)
     """
 
-    stack = deque() # holds the node to be explored (fringe in BFS, but I like the name stack more)
-    visited = set() # holds the visited nodes
+    start = tuple(initial_state)
+    goal = tuple(goal_state)
+
+    # every node generated is kept once in a flat list as (state, index of the parent, action)
+    # and the stack only holds indexes, so no path is copied while searching
+    nodes = [(start, -1, None)]
+    best_depth = {start: 0}  # smallest depth each state was reached at
+
+    if start == goal:
+        return [], len(nodes)
+    if depth_limit == 0:
+        return None, len(nodes)
 
-    stack.append((initial_state, [], 0))    # [(current state, path, current depth)]
+    # holds the node to be explored (fringe in BFS, but I like the name stack more)
+    # [(index of the node, current depth, generator of its children)]
+    stack = [(0, 0, successors(start, start.index(0), None))]
+    if stats is not None:
+        stats.nodes_expanded += 1
 
     # loop until you find the goal state
     while stack:
-        current_state, path, depth = stack.pop()  
+        if stats is not None:
+            stats.frontier(len(stack))
+            started = time.perf_counter()
+
+        index, depth, children = stack[-1]
+        current_state = nodes[index][0]
+
+        # the state was reached again at a smaller depth, that copy of it searches deeper
+        if best_depth[current_state] < depth:
+            stack.pop()
+            continue
+
+        child = next(children, None)
+        if child is None:   # every child was searched
+            stack.pop()
+            continue
+
+        action, new_state, new_blank = child
+        if stats is not None:
+            generated = time.perf_counter()
+            stats.expansion_time += generated - started
+            stats.nodes_generated += 1
+
+        if best_depth.get(new_state, depth_limit + 1) <= depth + 1:
+            if stats is not None:
+                stats.duplicates += 1
+                stats.queue_time += time.perf_counter() - generated
+            continue
+
+        best_depth[new_state] = depth + 1
+        nodes.append((new_state, index, action))
 
         # check if goal is found
-        if current_state == goal_state:
-            return path
-        
-        if depth < depth_limit:
-            visited.add(tuple(current_state))
-            for action in get_valid_move(current_state):
-                new_state = move_tile(current_state, action)
-                if tuple(new_state) not in visited:
-                    stack.append((new_state, path + [action], depth + 1))
+        if new_state == goal:
+            path = []
+            index = len(nodes) - 1
+            while nodes[index][1] != -1:
+                _, index, action = nodes[index]
+                path.append(action)
+            return list(reversed(path)), len(nodes)
 
-    return None
+        if depth + 1 < depth_limit:
+            stack.append((len(nodes) - 1, depth + 1, successors(new_state, new_blank, action)))
+            if stats is not None:
+                stats.nodes_expanded += 1
+
+        if stats is not None:
+            stats.queue_time += time.perf_counter() - generated
+            stats.closed(len(best_depth))
+
+    return None, len(nodes)
 
     
-def ids(initial_state: list, goal_state: list, max_depth = 20) -> list | None:
+def ids(initial_state: list, goal_state: list, max_depth: int | None = None, iterations: list | None = None,
+        stats: SearchStats | None = None) -> list | None:
     """
     Implementation of the IDS. Takes the initial and goal configuratios
     of the board and starts check each level and increases the depth
@@ -193,21 +464,37 @@ def ids(initial_state: list, goal_state: list, max_depth = 20) -> list | None:
     Args:
         initial_state (list): The inigial configration of the voard
         goal_state (list): The goal configuration of the board
-        max_depth (int): The maximum depth limit that it can go to
+        max_depth (int): The maximum depth limit that it can go to. If None it goes on
+                         until the goal is found, which always happens for a solvable board
+        iterations (list): If given, (depth limit, nodes generated) is appended
+                           to it for every iteration
+        stats (SearchStats): If given, it is filled in with the counters and timers of all the iterations
 
     Returns:
         list: Return the path if goal is found, else None
     """
 
+    # don't search at all if the goal can't be reached
+    if not is_solvable(initial_state, goal_state, WIDTH):
+        if stats is not None:
+            stats.finish()
+        return None
+
     depth_limit = 0 # start with the root (depth 0)
+    result = None
 
     # keep calling DFS until goal is met
-    for depth_limit in range(max_depth + 1):
-        result = dfs(initial_state, goal_state, depth_limit)
+    for depth_limit in range(max_depth + 1) if max_depth is not None else count():
+        result, generated = dfs(initial_state, goal_state, depth_limit, stats)
+        if iterations is not None:
+            iterations.append((depth_limit, generated))
         if result is not None:
-            return result
-        
-    return None
+            break
+
+    if stats is not None:
+        stats.finish()
+
+    return result
 
 
 def user_input(prompt: str) -> list:
@@ -242,16 +529,22 @@ def main() -> None:
     initial_state = user_input("Enter the state of the board (e.g. 4,1,0,2,5,3):")
     goal_state = user_input("Enter the goal state (e.g. 1,2,3,4,5,0):")
 
-    # # check if there is a solution
-    # if not is_solution(initial_state):
+    # check if there is a solution
+    if not is_solvable(initial_state, goal_state, WIDTH):
+        print("The goal state can't be reached from this state, the search will find no solution.")
+
+    cache = SolutionCache()  # so asking for the same board twice does not search again
 
     while True:
         print("\nMenu:")
         print("[1] BFS")
         print("[2] IDS")
-        print("[3] New initial state")
-        print("[4] New goal state")
-        print("[5] Exit")
+        print("[3] Bidirectional BFS")
+        print("[4] Precomputed table")
+        print("[5] External memory BFS")
+        print("[6] New initial state")
+        print("[7] New goal state")
+        print("[8] Exit")
 
         choice = input("\nChoose an option: ")
 
@@ -261,7 +554,8 @@ def main() -> None:
             print("============================================")
             # print("The start time is :",starttime)
 
-            result = bfs(initial_state, goal_state)
+            stats = SearchStats("bfs")
+            result = cache.solve("bfs", bfs, initial_state, goal_state, WIDTH, stats=stats)
             
             if result == None:
                 print("No solution")
@@ -271,6 +565,7 @@ def main() -> None:
                 print(f"No. of steps (BFS): {len(result)}\n")
             
             print("Time taken:", timeit.default_timer() - starttime)
+            print("Found in the cache" if cache.last_hit else stats)
             print("============================================")
 
         # IDS
@@ -278,7 +573,9 @@ def main() -> None:
             starttime = timeit.default_timer()
             print("============================================")
             # print("The start time is :",starttime)            
-            result = ids(initial_state, goal_state)
+            iterations = []
+            stats = SearchStats("ids")
+            result = cache.solve("ids", ids, initial_state, goal_state, WIDTH, iterations=iterations, stats=stats)
 
             if result is None:
                 print("No solution.")
@@ -287,24 +584,76 @@ def main() -> None:
                 print(*result)
                 print(f"No. of steps (IDS): {len(result)}\n")
 
+            for depth_limit, generated in iterations:
+                print(f"Depth {depth_limit}: {generated} nodes generated")
+
             print("Time taken:", timeit.default_timer() - starttime)   
+            print("Found in the cache" if cache.last_hit else stats)
             print("============================================")             
         
-        # New start state
+        # Bidirectional BFS
         elif choice == "3":
+            starttime = timeit.default_timer()
+            print("============================================")
+            result = bidirectional_bfs(initial_state, goal_state)
+
+            if result is None:
+                print("No solution.")
+            else:
+                print("Sequence of moves (Bidirectional BFS):", end=" ")
+                print(*result)
+                print(f"No. of steps (Bidirectional BFS): {len(result)}\n")
+
+            print("Time taken:", timeit.default_timer() - starttime)
+            print("============================================")
+
+        # Precomputed table
+        elif choice == "4":
+            starttime = timeit.default_timer()
+            print("============================================")
+            result = table_solve(load_solution_table(goal_state), initial_state)
+
+            if result is None:
+                print("No solution.")
+            else:
+                print("Sequence of moves (Table):", end=" ")
+                print(*result)
+                print(f"No. of steps (Table): {len(result)}\n")
+
+            print("Time taken:", timeit.default_timer() - starttime)
+            print("============================================")
+
+        # External memory BFS
+        elif choice == "5":
+            starttime = timeit.default_timer()
+            print("============================================")
+            result = external_bfs(initial_state, goal_state, WIDTH, report=print_layer)
+
+            if result is None:
+                print("No solution.")
+            else:
+                print("Sequence of moves (External BFS):", end=" ")
+                print(*result)
+                print(f"No. of steps (External BFS): {len(result)}\n")
+
+            print("Time taken:", timeit.default_timer() - starttime)
+            print("============================================")
+
+        # New start state
+        elif choice == "6":
             initial_state =  user_input("Enter the state of the board (e.g. 4,1,0,2,5,3):")
         
         # New goal state
-        elif choice == "4":
+        elif choice == "7":
             goal_state = user_input("Enter the goal state (e.g. 1,2,3,4,5,0):")
 
         # Exit
-        elif choice == "5":
+        elif choice == "8":
             progress_bar()
             break
 
         else:
-            print("Invalid choice. Please choose between 1-5")
+            print("Invalid choice. Please choose between 1-8")
 
 
 if __name__ == "__main__":
@@ -1,7 +1,28 @@
 #! /usr/bin/env python
 
 import timeit
+import time
 import heapq
+import mmap
+import os
+import sys
+import argparse
+import queue
+import multiprocessing
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice, count
+
+if __package__ in (None, ""):
+    # started as a script (python bejleri_3/bejleri_3_2.py) instead of with python -m: the packages
+    # and the shared modules live at the top of the repo
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bejleri_3.sliding_puzzle import (is_solvable, build_neighbors, distance_table, encode_state, decode_state,
+                                      INVERSE, BITS, MASK)
+from bejleri_3.solution_cache import SolutionCache
+from search_stats import SearchStats
 
 """
 8-tile puzzle solved with A* for 2 different heuristics, Manhattan Distance (MD)
@@ -31,6 +52,35 @@ There are 4 possible actions:
 *Right = R
 """
 
+WIDTH = 3   # number of columns on the board
+SIZE = 9    # number of cells on the board
+
+
+NEIGHBORS = build_neighbors(WIDTH, SIZE)
+
+
+def expand(code: int, blank_tile: int) -> list:
+    """
+    Generate the successors of a packed state. The blank is 0 in the packed
+    state, so sliding a tile into it is just two XORs.
+
+    Args:
+        code (int): The packed configuration of the board
+        blank_tile (int): The position of the blank tile in that configuration
+
+    Returns:
+        list: A list of (move, new code, new blank position, moved tile) tuples
+    """
+    successors = []
+
+    for move, tile_pos in NEIGHBORS[blank_tile]:
+        tile = (code >> (BITS * tile_pos)) & MASK
+        new_code = code ^ (tile << (BITS * tile_pos)) ^ (tile << (BITS * blank_tile))
+        successors.append((move, new_code, tile_pos, tile))
+
+    return successors
+
+
 def get_valid_moves(state: list) -> list:
     """
     Get the next valid move depending on the current state
@@ -138,6 +188,473 @@ def out_of_place_tiles(state: list, goal: list) -> int:
     return oop_tiles
 
 
+def manhattan_table(goal: list) -> list:
+    """
+    Build the lookup table used to update the Manhattan distance incrementally.
+    table[tile][cell] is the distance of the tile from its goal cell when it sits on cell.
+
+    Args:
+        goal (list): The goal configuration of the board
+
+    Returns:
+        list: A list of lists indexed by [tile][cell]
+    """
+    return distance_table(goal, WIDTH)
+
+
+def out_of_place_table(goal: list) -> list:
+    """
+    Build the lookup table used to update the out of place tiles incrementally.
+    table[tile][cell] is 1 if the tile is out of place when it sits on cell, else 0.
+
+    Args:
+        goal (list): The goal configuration of the board
+
+    Returns:
+        list: A list of lists indexed by [tile][cell]
+    """
+    table = [[0] * SIZE for _ in range(SIZE)]
+
+    for tile in range(1, SIZE):  # excludes 0
+        for cell in range(SIZE):
+            table[tile][cell] = 0 if goal[cell] == tile else 1
+
+    return table
+
+
+# heuristics that can be updated incrementally and the function that builds their table,
+# filled in by register_heuristic
+INCREMENTAL_TABLES = {}
+
+
+def heuristic_value(table: list, state: list) -> int:
+    """
+    Evaluate a heuristic from scratch using its lookup table
+
+    Args:
+        table (list): The table made by manhattan_table or out_of_place_table
+        state (list): The configuration of the board
+
+    Returns:
+        int: The value of the heuristic for the state
+    """
+    return sum(table[tile][cell] for cell, tile in enumerate(state))
+
+
+def heuristic_delta(table: list, tile: int, from_cell: int, to_cell: int) -> int:
+    """
+    Change in the heuristic when a tile slides from one cell into another.
+    Only the moved tile changes place, so this is O(1).
+
+    Args:
+        table (list): The table made by manhattan_table or out_of_place_table
+        tile (int): The tile that was moved
+        from_cell (int): The cell the tile was on
+        to_cell (int): The cell the tile moved to
+
+    Returns:
+        int: The value to add to the parent's h to get the child's h
+    """
+    return table[tile][to_cell] - table[tile][from_cell]
+
+
+PATTERNS = ((1, 2, 3, 4), (5, 6, 7, 8))   # disjoint groups of tiles, one database per group
+PDB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdb_cache")
+UNREACHED = 255 # marks an entry of the database that was never reached
+pattern_databases = {}  # databases already loaded by this process, keyed by (goal, pattern)
+
+
+def pattern_index(positions: list) -> int:
+    """
+    Turn the cells of the pattern tiles and the blank into an index
+    of the pattern database (base SIZE number)
+
+    Args:
+        positions (list): The cells of the pattern tiles followed by the cell of the blank
+
+    Returns:
+        int: The index in the database
+    """
+    index = 0
+
+    for cell in reversed(positions):
+        index = index * SIZE + cell
+
+    return index
+
+
+def build_pattern_database(goal: list, pattern: tuple) -> bytearray:
+    """
+    Build the database of one group of tiles with a backward BFS from the goal.
+    Only moves of the pattern tiles cost 1, moves of the other tiles cost 0,
+    so the databases of disjoint groups can be added together and stay admissible.
+    The blank is kept in the index so the heuristic stays consistent.
+
+    Args:
+        goal (list): The goal configuration of the board
+        pattern (tuple): The tiles of the group
+
+    Returns:
+        bytearray: The distance to the goal of every (pattern cells, blank cell)
+    """
+    database = bytearray([UNREACHED]) * (SIZE ** (len(pattern) + 1))
+    start = [goal.index(tile) for tile in pattern] + [goal.index(0)]
+    database[pattern_index(start)] = 0
+    fringe = deque([start])
+
+    # 0-1 BFS: 0 cost moves go to the front of the fringe, 1 cost moves to the back
+    while fringe:
+        positions = fringe.popleft()
+        distance = database[pattern_index(positions)]
+        blank_tile = positions[-1]
+
+        for move, tile_pos in NEIGHBORS[blank_tile]:
+            new_positions = positions.copy()
+            new_positions[-1] = tile_pos
+            cost = 0
+
+            if tile_pos in positions:
+                new_positions[positions.index(tile_pos)] = blank_tile
+                cost = 1
+
+            index = pattern_index(new_positions)
+            if distance + cost < database[index]:
+                database[index] = distance + cost
+                if cost == 0:
+                    fringe.appendleft(new_positions)
+                else:
+                    fringe.append(new_positions)
+
+    return database
+
+
+def load_pattern_database(goal: list, pattern: tuple, cache_dir: str = PDB_DIR) -> mmap.mmap:
+    """
+    Load the database of one group of tiles from the disk, building and
+    saving it first if it is not there. The file is memory-mapped read only,
+    so every solver process that uses the same goal shares one copy.
+
+    Args:
+        goal (list): The goal configuration of the board
+        pattern (tuple): The tiles of the group
+        cache_dir (str): The folder the databases are kept in
+
+    Returns:
+        mmap.mmap: The database, indexed like the bytearray of build_pattern_database
+    """
+    name = "pdb_" + "".join(map(str, goal)) + "_" + "".join(map(str, pattern)) + ".bin"
+    path = os.path.join(cache_dir, name)
+
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        database = build_pattern_database(goal, pattern)
+
+        # write to a temporary file first so another process never reads half a file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(database)
+        os.replace(temp_path, path)
+
+    with open(path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def pdb_heuristic(state: list, goal: list) -> int:
+    """
+    Additive disjoint pattern database heuristic. The value is the sum of
+    the databases of the groups in PATTERNS.
+
+    Args:
+        state (list): The current configuration of the board
+        goal (list): The goal configuration of the board
+
+    Returns:
+        int: An integer that represents the distance
+    """
+    databases = []
+
+    for pattern in PATTERNS:
+        key = (tuple(goal), pattern)
+        if key not in pattern_databases:
+            pattern_databases[key] = load_pattern_database(list(goal), pattern)
+        databases.append((pattern, pattern_databases[key]))
+
+    # cell of every tile in the current state
+    positions = [0] * SIZE
+    for cell, tile in enumerate(state):
+        positions[tile] = cell
+
+    distance = 0
+
+    for pattern, database in databases:
+        index = pattern_index([positions[tile] for tile in pattern] + [positions[0]])
+        distance += database[index]
+
+    return distance
+
+
+def goal_cells(goal: list) -> list:
+    """
+    Args:
+        goal (list): The goal configuration of the board
+
+    Returns:
+        list: The goal cell of every tile, indexed by tile
+    """
+    cells = [0] * SIZE
+    for cell, tile in enumerate(goal):
+        cells[tile] = cell
+
+    return cells
+
+
+def line_conflicts(order: list) -> int:
+    """
+    Smallest number of tiles to take out of a line (row or column) so that the
+    tiles left are in goal order: the number of tiles minus the longest increasing
+    subsequence. Each of them has to leave the line and come back, 2 extra moves.
+
+    Args:
+        order (list): The goal place along the line of the tiles that are in their
+                      goal line, in the order they are in now
+
+    Returns:
+        int: The number of tiles to take out
+    """
+    longest = [1] * len(order)  # longest increasing subsequence ending at each tile
+
+    for i in range(len(order)):
+        for j in range(i):
+            if order[j] < order[i] and longest[j] + 1 > longest[i]:
+                longest[i] = longest[j] + 1
+
+    return len(order) - max(longest, default=0)
+
+
+def linear_conflict(state: list, goal: list) -> int:
+    """
+    Manhattan distance plus linear conflicts. Two tiles that are in their goal row
+    (or column) in the wrong order can't pass each other, so one of them has to
+    leave the line and come back, which costs 2 moves more than the Manhattan distance.
+
+    Args:
+        state (list): The current configuration of the board
+        goal (list): The goal configuration of the board
+
+    Returns:
+        int: An integer that represents the distance
+    """
+    cells = goal_cells(goal)
+    height = SIZE // WIDTH
+    distance = 0
+    conflicts = 0
+
+    for cell, tile in enumerate(state):
+        if tile != 0:
+            row, column = divmod(cell, WIDTH)
+            goal_row, goal_column = divmod(cells[tile], WIDTH)
+            distance += abs(row - goal_row) + abs(column - goal_column)
+
+    for row in range(height):
+        line = state[row * WIDTH:(row + 1) * WIDTH]
+        conflicts += line_conflicts([cells[tile] % WIDTH for tile in line
+                                     if tile != 0 and cells[tile] // WIDTH == row])
+
+    for column in range(WIDTH):
+        line = state[column::WIDTH]
+        conflicts += line_conflicts([cells[tile] // WIDTH for tile in line
+                                     if tile != 0 and cells[tile] % WIDTH == column])
+
+    return distance + 2 * conflicts
+
+
+walking_distance_tables = {}    # tables already built by this process, keyed by (lines, goal line of the blank)
+
+
+def walking_distance_table(lines: int, blank_line: int) -> dict:
+    """
+    Build the walking distance table with a BFS. The board is seen only by rows:
+    a state is how many tiles of each goal row are in each row, and where the blank is.
+    A move takes a tile from a row next to the blank's row into it. The table holds
+    the smallest number of such moves to reach the goal. Columns are the same
+    problem turned sideways, so the same table is used for them.
+
+    Args:
+        lines (int): Number of rows
+        blank_line (int): The row of the blank in the goal
+
+    Returns:
+        dict: (counts, blank row) -> distance, counts[row * lines + goal row] is the number
+              of tiles of goal row in row
+    """
+    counts = [0] * (lines * lines)
+    for line in range(lines):
+        counts[line * lines + line] = lines - (line == blank_line)
+
+    start = (tuple(counts), blank_line)
+    table = {start: 0}
+    fringe = deque([start])
+
+    while fringe:
+        counts, blank_row = fringe.popleft()
+        distance = table[(counts, blank_row)]
+
+        for row in (blank_row - 1, blank_row + 1):
+            if not 0 <= row < lines:
+                continue
+            # any tile of the next row can slide into the blank's row, only its goal row matters
+            for goal_row in range(lines):
+                if counts[row * lines + goal_row] == 0:
+                    continue
+                new_counts = list(counts)
+                new_counts[row * lines + goal_row] -= 1
+                new_counts[blank_row * lines + goal_row] += 1
+                new_state = (tuple(new_counts), row)
+                if new_state not in table:
+                    table[new_state] = distance + 1
+                    fringe.append(new_state)
+
+    return table
+
+
+def walking_distance(state: list, goal: list) -> int:
+    """
+    Walking distance heuristic: the moves needed when only the rows of the tiles
+    are counted, plus the same for the columns. Every move changes either the rows
+    or the columns by one step, so it never overestimates.
+
+    Args:
+        state (list): The current configuration of the board
+        goal (list): The goal configuration of the board
+
+    Returns:
+        int: An integer that represents the distance
+    """
+    cells = goal_cells(goal)
+    lines = WIDTH   # the board is square
+    blank_row, blank_column = divmod(cells[0], WIDTH)
+
+    for key in ((lines, blank_row), (lines, blank_column)):
+        if key not in walking_distance_tables:
+            walking_distance_tables[key] = walking_distance_table(*key)
+
+    row_counts = [0] * (lines * lines)
+    column_counts = [0] * (lines * lines)
+
+    for cell, tile in enumerate(state):
+        if tile != 0:
+            row, column = divmod(cell, WIDTH)
+            row_counts[row * lines + cells[tile] // WIDTH] += 1
+            column_counts[column * lines + cells[tile] % WIDTH] += 1
+
+    blank = state.index(0)
+
+    return (walking_distance_tables[(lines, blank_row)][(tuple(row_counts), blank // WIDTH)]
+            + walking_distance_tables[(lines, blank_column)][(tuple(column_counts), blank % WIDTH)])
+
+
+class Heuristic:
+    """
+    An entry of the heuristic registry
+
+    Args:
+        name (str): The name solvers and the command line select it by
+        label (str): The short name shown in the menu
+        function: The heuristic, function(state, goal) -> int
+        admissible (bool): It never overestimates, so A* finds the optimal solution
+        consistent (bool): It changes by at most 1 per move, so A* never has to reopen a state
+        table: Builds the table of incremental updates for a goal (see heuristic_delta),
+               None if the heuristic is evaluated from scratch on every node
+    """
+
+    def __init__(self, name: str, label: str, function, admissible: bool, consistent: bool,
+                 table=None) -> None:
+        self.name = name
+        self.label = label
+        self.function = function
+        self.admissible = admissible
+        self.consistent = consistent
+        self.table = table
+
+    @property
+    def incremental(self) -> bool:
+        return self.table is not None
+
+
+HEURISTICS = {} # the registry, name -> Heuristic
+
+
+def register_heuristic(name: str, label: str, function, admissible: bool, consistent: bool,
+                       table=None) -> Heuristic:
+    """
+    Add a heuristic to the registry, so the solvers and the command line can use it by name
+
+    Args:
+        See Heuristic
+
+    Returns:
+        Heuristic: The entry
+    """
+    heuristic = Heuristic(name, label, function, admissible, consistent, table)
+    HEURISTICS[name] = heuristic
+    if table is not None:
+        INCREMENTAL_TABLES[function] = table
+
+    return heuristic
+
+
+def resolve_heuristic(heuristic):
+    """
+    Args:
+        heuristic: A name in HEURISTICS or a heuristic function
+
+    Returns:
+        The heuristic function
+    """
+    if isinstance(heuristic, str):
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic: {heuristic}")
+        return HEURISTICS[heuristic].function
+
+    return heuristic
+
+
+def heuristic_entry(function) -> Heuristic | None:
+    """
+    Args:
+        function: A heuristic function
+
+    Returns:
+        Heuristic: Its entry in the registry, None if it is not registered
+    """
+    for entry in HEURISTICS.values():
+        if entry.function is function:
+            return entry
+
+    return None
+
+
+def check_admissible(function, solver: str) -> None:
+    """
+    Refuse a registered heuristic that is not admissible in a search that promises
+    optimal solutions (or proven bounds). Unregistered functions are trusted.
+
+    Args:
+        function: The heuristic function
+        solver (str): Name of the search, for the error message
+    """
+    entry = heuristic_entry(function)
+    if entry is not None and not entry.admissible:
+        raise ValueError(f"{solver} needs an admissible heuristic, {entry.name} is not")
+
+
+register_heuristic("md", "MD", manhattan_distance, admissible=True, consistent=True, table=manhattan_table)
+register_heuristic("oop", "OOP", out_of_place_tiles, admissible=True, consistent=True, table=out_of_place_table)
+register_heuristic("pdb", "PDB", pdb_heuristic, admissible=True, consistent=True)
+register_heuristic("lc", "LC", linear_conflict, admissible=True, consistent=True)
+register_heuristic("wd", "WD", walking_distance, admissible=True, consistent=True)
+
+
 def moves_taken(origin: dict, current_state: tuple) -> list:
     """
     Function that returns the moves taken once the goal configuration is reached
@@ -160,10 +677,88 @@ def moves_taken(origin: dict, current_state: tuple) -> list:
     return list(reversed(moves)) # return the path in reverse
 
 
-def a_star(initial_state: list, goal_state: list, heuristic) -> list | None:
+class HeapOpenList:
+    """
+    Open list of a_star kept in a binary heap. States with the same f are
+    popped deepest first (highest g), which reaches the goal sooner because
+    the deeper state is closer to it when the heuristic is right.
+    """
+
+    def __init__(self) -> None:
+        self.heap = []
+
+    def push(self, f: int, g: int, state: int, blank_tile: int) -> None:
+        heapq.heappush(self.heap, (f, -g, state, blank_tile))   # -g so the highest g comes first
+
+    def pop(self) -> tuple:
+        f, g, state, blank_tile = heapq.heappop(self.heap)
+        return f, -g, state, blank_tile
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class BucketOpenList:
+    """
+    Open list of a_star kept as an array of buckets indexed by f and then by g.
+    f and g are small integers here, so push and pop are O(1) (amortized) and
+    no tuples are compared. Ties on f are popped deepest first, like HeapOpenList.
+    """
+
+    def __init__(self) -> None:
+        self.buckets = []   # buckets[f][g] is a list of (state, blank) pairs
+        self.min_f = 0      # no bucket below this one holds a state
+        self.size = 0
+
+    def push(self, f: int, g: int, state: int, blank_tile: int) -> None:
+        while len(self.buckets) <= f:
+            self.buckets.append([])
+        by_g = self.buckets[f]
+        while len(by_g) <= g:
+            by_g.append([])
+
+        by_g[g].append((state, blank_tile))
+        self.min_f = min(self.min_f, f)
+        self.size += 1
+
+    def pop(self) -> tuple:
+        if self.size == 0:
+            raise IndexError("pop from an empty open list")
+
+        # the lowest f bucket that holds a state, then its highest g
+        while not self.buckets[self.min_f]:
+            self.min_f += 1
+        f = self.min_f
+        by_g = self.buckets[f]
+        g = len(by_g) - 1
+        state, blank_tile = by_g[g].pop()
+
+        # drop the empty lists at the end, so the highest g is always the last one
+        while by_g and not by_g[-1]:
+            by_g.pop()
+        self.size -= 1
+
+        return f, g, state, blank_tile
+
+    def __len__(self) -> int:
+        return self.size
+
+
+OPEN_LISTS = {
+    "heap": HeapOpenList,
+    "bucket": BucketOpenList,
+}
+
+
+def a_star(initial_state: list, goal_state: list, heuristic,
+           stats: SearchStats | None = None, open_list=HeapOpenList, weight: float = 1,
+           max_nodes: int | None = None) -> list | None:
     """
     Implementation of the A* search.
     *f(n) = g(n) + h(n)
+
+    With a weight w > 1 it is weighted A*, f(n) = g(n) + w * h(n): it expands far
+    fewer nodes and the solution is at most w times longer than the optimal one.
     
     h(n) = amount of out of place tiles
     g(n) = amount of moves so far
@@ -171,48 +766,1009 @@ def a_star(initial_state: list, goal_state: list, heuristic) -> list | None:
     Args:
         initial_state (list): The initial configuration of the board
         goal_state (list): The goal configuration of the board
+        heuristic: The heuristic function or its name in HEURISTICS. The incremental
+                   ones (manhattan_distance, out_of_place_tiles) are updated from the
+                   parent's h, any other (e.g. pdb_heuristic) is evaluated per node
+        stats (SearchStats): If given, it is filled in with the counters and timers of the search
+        open_list: The class of the open list, one of OPEN_LISTS
+        weight (float): The weight w of h(n), 1 for the optimal solution
+        max_nodes (int): If given, once more states than this are stored the search
+                         starts over with sma_star, this budget and the same weight (the open
+                         list is not used there). A MemoryBudgetWarning is issued and
+                         stats.fell_back is set
 
     Returns:
         list: A list with the moves applied to reach the 
     """
-    start = tuple(initial_state)
-    goal = tuple(goal_state)
+    heuristic = resolve_heuristic(heuristic)
+    if weight < 1:
+        raise ValueError("The weight must be at least 1")
+    if weight == 1:
+        check_admissible(heuristic, "Optimal A*")
+    if weight == int(weight):
+        weight = int(weight)    # keep f an int, so BucketOpenList can index by it
+    elif open_list is BucketOpenList:
+        raise ValueError("BucketOpenList needs an integer weight")
+
+    # don't search at all if the goal can't be reached
+    if not is_solvable(initial_state, goal_state, WIDTH):
+        if stats is not None:
+            stats.finish()
+        return None
+
+    # states are packed into ints (see encode_state), which are much cheaper
+    # to hash and store than tuples
+    start = encode_state(initial_state)
+    goal = encode_state(goal_state)
 
     closed = set()  # visited states
     g_score = {start: 0}
-    frontier = []   # states waiting to be explored
+    frontier = open_list()  # states waiting to be explored
+
+    # with a consistent heuristic the first g of an expanded state is its best one,
+    # else a closed state is opened again when a shorter way to it turns up
+    entry = heuristic_entry(heuristic)
+    reopen = entry is None or not entry.consistent
     origin = {} # dictionary to store the path
 
-    h = heuristic(start, goal)
+    # build the lookup table once per search if the heuristic supports
+    # incremental updates, otherwise evaluate it on every push
+    table = None
+    if heuristic in INCREMENTAL_TABLES:
+        table = INCREMENTAL_TABLES[heuristic](goal_state)
+        h = heuristic_value(table, initial_state)
+    else:
+        h = heuristic(tuple(initial_state), tuple(goal_state))
     g = 0   # starts with 0 moves
-    f = g + h
+    f = g + weight * h
+
+    frontier.push(f, g, start, initial_state.index(0))
 
-    # start the heapmin
-    heapq.heappush(frontier, (f, g, start)) # put (f, g, state) in the heapmin
+    timed = stats is not None   # the timers are only read when someone wants the stats
+    clock = time.perf_counter
 
     while frontier:
-        f, g, current_state = heapq.heappop(frontier)
+        if timed:
+            started = clock()
+        f, g, current_state, blank_tile = frontier.pop()
+        if timed:
+            stats.queue_time += clock() - started
+
+        # stale entry: the state was pushed again with a smaller g, or already expanded
+        if current_state in closed or g > g_score[current_state]:
+            if timed:
+                stats.duplicates += 1
+            continue
 
         if current_state == goal:
+            if timed:
+                stats.finish()
             return moves_taken(origin, current_state)
         
         closed.add(current_state)    
-
-        for move in get_valid_moves(list(current_state)):
-            new_state = tuple(move_tile(list(current_state), move))
+        # h of the current state, the children's h is computed from it
+        h = f - g if weight == 1 else round((f - g) / weight)
+
+        if timed:
+            started = clock()
+        successors = expand(current_state, blank_tile)
+        if timed:
+            stats.expansion_time += clock() - started
+            stats.nodes_expanded += 1
+            stats.nodes_generated += len(successors)
+
+        for move, new_state, new_blank, tile in successors:
             temp_g = g + 1
             
             if new_state in closed:
-                continue
+                if not reopen or temp_g >= g_score[new_state]:
+                    if timed:
+                        stats.duplicates += 1
+                    continue
+                closed.discard(new_state)
 
             if new_state not in g_score or temp_g < g_score[new_state]:
                 g_score[new_state] = temp_g
-                f = temp_g + heuristic(new_state, goal)
-                heapq.heappush(frontier, (f, temp_g, new_state))
+
+                if timed:
+                    started = clock()
+                if table is not None:
+                    # the tile moved from new_blank into the old blank cell
+                    f = temp_g + weight * (h + heuristic_delta(table, tile, new_blank, blank_tile))
+                else:
+                    f = temp_g + weight * heuristic(decode_state(new_state, SIZE), goal_state)
+                if timed:
+                    pushed = clock()
+                    stats.heuristic_time += pushed - started
+
+                frontier.push(f, temp_g, new_state, new_blank)
+                if timed:
+                    stats.queue_time += clock() - pushed
 
                 origin[new_state] = (current_state, move)
+            elif timed:
+                stats.duplicates += 1
 
-        
+        if timed:
+            stats.frontier(len(frontier))
+            stats.closed(len(closed))
+
+        if max_nodes is not None and len(g_score) > max_nodes:
+            # out of memory budget: free everything and start over with the bounded search
+            del closed, g_score, frontier, origin
+            if stats is not None:
+                stats.fell_back = True
+            warnings.warn(f"A* stored more than {max_nodes} states, continuing with SMA*",
+                          MemoryBudgetWarning, stacklevel=2)
+            return sma_star(initial_state, goal_state, heuristic, max_nodes, stats, weight=weight)
+
+    if timed:
+        stats.finish()
+
+    return None
+
+
+class MemoryBudgetWarning(RuntimeWarning):
+    """Issued when a_star goes over its memory budget and falls back to sma_star"""
+
+
+class MemoryNode:
+    """
+    A node of the search tree kept by sma_star. Slots keep every node small,
+    since the number of nodes is what the memory budget counts.
+    """
+
+    __slots__ = ("state", "blank_tile", "g", "h", "f", "parent", "move", "depth",
+                 "children", "forgotten", "expanded", "key", "entry", "alive")
+
+    def __init__(self, state: int, blank_tile: int, g: int, h: int, f: float, parent, move: str | None) -> None:
+        self.state = state
+        self.blank_tile = blank_tile
+        self.g = g
+        self.h = h
+        self.f = f              # backed up to the lowest f of the children once expanded
+        self.parent = parent
+        self.move = move        # the move that leads here from the parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.children = {}      # move -> child, for the children in memory
+        self.forgotten = {}     # move -> f of the children that were evicted
+        self.expanded = False
+        self.key = None         # f it was queued with in the open list, None if not queued
+        self.entry = None       # number of its current entry in the open list
+        self.alive = True       # False once evicted
+
+
+def sma_star(initial_state: list, goal_state: list, heuristic, max_nodes: int = 100000,
+             stats: SearchStats | None = None, weight: float = 1) -> list | None:
+    """
+    Simplified Memory-bounded A* (SMA*). It searches a tree of at most max_nodes nodes:
+    when a new node would go over the budget, the worst leaf (highest f, then the shallowest)
+    is evicted and its f is remembered by its parent, which is searched again if every
+    better option runs out. The f of a node is backed up to the lowest f of its children,
+    so the memory of evicted subtrees is not lost.
+
+    The solution is optimal if the optimal path fits in max_nodes nodes, else it is None.
+    With a weight w > 1, f(n) = g(n) + w * h(n) like weighted A*, and the solution is
+    at most w times longer than the optimal one.
+    The move that undoes the previous one is never tried, but other cycles are not
+    detected since there is no closed set, so it expands more nodes than a_star.
+
+    Args:
+        initial_state (list): The initial configuration of the board
+        goal_state (list): The goal configuration of the board
+        heuristic: The heuristic function or its name, like for a_star
+        max_nodes (int): The most nodes kept in memory at once
+        stats (SearchStats): If given, it is filled in with the counters of the search,
+                             stats.evictions tells how many nodes were evicted
+        weight (float): The weight w of h(n), 1 for the optimal solution
+
+    Returns:
+        list: A list with the moves applied to reach the goal or None
+    """
+    heuristic = resolve_heuristic(heuristic)
+    if max_nodes < 2:
+        raise ValueError("The memory budget must hold at least 2 nodes")
+    if weight < 1:
+        raise ValueError("The weight must be at least 1")
+    if weight == 1:
+        check_admissible(heuristic, "SMA*")
+
+    if not is_solvable(initial_state, goal_state, WIDTH):
+        if stats is not None:
+            stats.finish()
+        return None
+
+    start = encode_state(initial_state)
+    goal = encode_state(goal_state)
+    table = INCREMENTAL_TABLES[heuristic](goal_state) if heuristic in INCREMENTAL_TABLES else None
+
+    if table is not None:
+        h = heuristic_value(table, initial_state)
+    else:
+        h = heuristic(tuple(initial_state), tuple(goal_state))
+    root = MemoryNode(start, initial_state.index(0), 0, h, weight * h, None, None)
+    stored = 1  # nodes in memory
+
+    tie = count()   # so the heaps never compare nodes
+    open_heap = []  # (key, -depth, tie, node): lowest f first, then the deepest
+    leaves = []     # (-f, depth, tie, node): highest f first, then the shallowest
+
+    def queue(node: MemoryNode, key: float) -> None:
+        # (re)queue a node that still has children to generate; old entries go stale
+        node.key = key
+        node.entry = next(tie)
+        heapq.heappush(open_heap, (key, -node.depth, node.entry, node))
+
+    def add_leaf(node: MemoryNode) -> None:
+        heapq.heappush(leaves, (-node.f, node.depth, next(tie), node))
+
+    def back_up(node: MemoryNode) -> None:
+        # the f of an expanded node is the lowest f of its children, in memory or not
+        while node is not None:
+            values = [child.f for child in node.children.values()] + list(node.forgotten.values())
+            new_f = min(values)
+            if new_f == node.f:
+                break
+            node.f = new_f
+            if not node.children:
+                add_leaf(node)  # its entry in the leaves heap has the old f
+            node = node.parent
+
+    def evict() -> None:
+        # drop the worst leaf and let its parent remember its f
+        nonlocal stored
+        while True:
+            negative_f, _, _, leaf = heapq.heappop(leaves)
+            if leaf.alive and not leaf.children and leaf.parent is not None and -negative_f == leaf.f:
+                break
+
+        parent = leaf.parent
+        leaf.alive = False
+        del parent.children[leaf.move]
+        parent.forgotten[leaf.move] = leaf.f
+        stored -= 1
+        if stats is not None:
+            stats.evictions += 1
+
+        queue(parent, min(parent.forgotten.values()))
+        if not parent.children:
+            add_leaf(parent)
+
+    def compact() -> None:
+        # drop the stale heap entries, so the heaps stay in the budget as well
+        open_heap.clear()
+        leaves.clear()
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            if node.key is not None:
+                node.entry = next(tie)
+                open_heap.append((node.key, -node.depth, node.entry, node))
+            if node.children:
+                pending.extend(node.children.values())
+            elif node.parent is not None:
+                leaves.append((-node.f, node.depth, next(tie), node))
+        heapq.heapify(open_heap)
+        heapq.heapify(leaves)
+
+    queue(root, root.f)
+    add_leaf(root)
+
+    while open_heap:
+        key, _, entry, node = heapq.heappop(open_heap)
+        if not node.alive or node.entry != entry:
+            continue    # stale entry
+
+        if key == float('inf'):
+            break   # every option left needs more memory than the budget
+
+        if node.state == goal:
+            moves = []
+            while node.parent is not None:
+                moves.append(node.move)
+                node = node.parent
+            if stats is not None:
+                stats.finish()
+            return list(reversed(moves))
+
+        # generate the children that are not in memory: all of them the first time,
+        # then the ones that were evicted
+        node.key = node.entry = None
+        children = []
+        for move, new_state, new_blank, tile in expand(node.state, node.blank_tile):
+            if move == INVERSE.get(node.move) or move in node.children:
+                continue
+            if node.expanded and move not in node.forgotten:
+                continue
+
+            if table is not None:
+                # the tile moved from new_blank into the old blank cell
+                h = node.h + heuristic_delta(table, tile, new_blank, node.blank_tile)
+            else:
+                h = heuristic(decode_state(new_state, SIZE), goal_state)
+            child = MemoryNode(new_state, new_blank, node.g + 1, h, 0, node, move)
+
+            if new_state != goal and child.depth >= max_nodes - 1:
+                child.f = float('inf')  # the path to any goal below it can't fit in memory
+            else:
+                # pathmax: a child is never better than its parent, and an evicted child
+                # comes back with the f it was backed up to
+                child.f = max(node.f, child.g + weight * h, node.forgotten.get(move, 0))
+
+            children.append(child)
+
+        node.expanded = True
+        node.forgotten.clear()
+        if stats is not None:
+            stats.nodes_expanded += 1
+            stats.nodes_generated += len(children)
+
+        for child in children:
+            node.children[child.move] = child
+            stored += 1
+            queue(child, child.f)
+            add_leaf(child)
+            while stored > max_nodes:
+                evict()
+
+        if node.children or node.forgotten:
+            back_up(node)
+
+        if len(open_heap) + len(leaves) > 4 * max_nodes + 64:
+            compact()
+
+        if stats is not None:
+            stats.frontier(len(open_heap))
+            stats.closed(stored)
+
+    if stats is not None:
+        stats.finish()
+
+    return None
+
+
+ANYTIME_WEIGHT = 3.0    # first weight of anytime_a_star, big enough for a fast first solution
+
+
+def anytime_a_star(initial_state: list, goal_state: list, heuristic, weight: float = ANYTIME_WEIGHT,
+                   weight_step: float = 0.5, time_limit: float | None = None,
+                   stats: SearchStats | None = None):
+    """
+    Anytime Repairing A* (ARA*). It starts as weighted A* with a big weight, so the
+    first solution comes fast, then lowers the weight and repairs the search instead
+    of starting over: the g values are kept and only the states whose g got better
+    are searched again. It stops when the solution is proven optimal or the time is up.
+
+    Every solution comes with the proven suboptimality bound: the solution is at most
+    bound times longer than the optimal one. The bound is the smaller of the weight and
+    the length of the solution divided by the lowest g(n) + h(n) still waiting,
+    which no solution can beat as long as the heuristic is admissible.
+
+    Args:
+        initial_state (list): The initial configuration of the board
+        goal_state (list): The goal configuration of the board
+        heuristic: The heuristic function or its name, like for a_star
+        weight (float): The weight of the first search
+        weight_step (float): How much the weight is lowered after every search
+        time_limit (float): Seconds after which the search stops improving the solution,
+                            None to run until optimal
+        stats (SearchStats): If given, it is filled in with the counters and timers of the search
+
+    Yields:
+        tuple: (moves, bound) every time the solution or the bound gets better,
+               the last one has bound 1.0 if the search was not stopped by the time limit
+    """
+    heuristic = resolve_heuristic(heuristic)
+    if weight < 1:
+        raise ValueError("The weight must be at least 1")
+    check_admissible(heuristic, "Anytime A*")   # the bounds are only proven for admissible ones
+
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+
+    if not is_solvable(initial_state, goal_state, WIDTH):
+        if stats is not None:
+            stats.finish()
+        return
+
+    start = encode_state(initial_state)
+    goal = encode_state(goal_state)
+
+    table = INCREMENTAL_TABLES[heuristic](goal_state) if heuristic in INCREMENTAL_TABLES else None
+
+    def h_of(state: int, parent: int, tile: int, from_cell: int, to_cell: int) -> int:
+        # h of a new state, from the h of its parent when the heuristic supports it
+        if table is not None:
+            return h_score[parent] + heuristic_delta(table, tile, from_cell, to_cell)
+        return heuristic(decode_state(state, SIZE), goal_state)
+
+    g_score = {start: 0}
+    h_score = {
+        start: heuristic_value(table, initial_state) if table is not None
+        else heuristic(tuple(initial_state), tuple(goal_state))
+    }
+    origin = {}
+    waiting = {start: initial_state.index(0)}   # states in the open list and their blank
+    inconsistent = {}   # closed states whose g got better, searched again with the next weight
+    closed = set()
+    heap = [(weight * h_score[start], 0, start, waiting[start])]
+    proven_weight = float('inf')    # weight of the last search that was not stopped
+    best = None     # (number of moves, bound) of the last solution yielded
+    expansions = 0
+
+    try:
+        while True:
+            # search until no state in the open list can lead to a better solution
+            goal_g = g_score.get(goal, float('inf'))
+            stopped = False
+
+            while heap and heap[0][0] < goal_g:
+                # the time limit only cuts the improvements, the first solution is always found
+                if (deadline is not None and goal_g != float('inf') and expansions % 256 == 0
+                        and time.perf_counter() > deadline):
+                    stopped = True
+                    break
+
+                _, g, current_state, blank_tile = heapq.heappop(heap)
+                g = -g
+                # stale entry: pushed again with a smaller g, or already expanded with this weight
+                if current_state not in waiting or g != g_score[current_state]:
+                    if stats is not None:
+                        stats.duplicates += 1
+                    continue
+
+                del waiting[current_state]
+                closed.add(current_state)
+                expansions += 1
+
+                successors = expand(current_state, blank_tile)
+                if stats is not None:
+                    stats.nodes_expanded += 1
+                    stats.nodes_generated += len(successors)
+
+                for move, new_state, new_blank, tile in successors:
+                    temp_g = g + 1
+                    if temp_g >= g_score.get(new_state, float('inf')):
+                        if stats is not None:
+                            stats.duplicates += 1
+                        continue
+
+                    g_score[new_state] = temp_g
+                    origin[new_state] = (current_state, move)
+                    if new_state == goal:
+                        goal_g = temp_g
+                    if new_state not in h_score:
+                        h_score[new_state] = h_of(new_state, current_state, tile, new_blank, blank_tile)
+
+                    if new_state in closed:
+                        inconsistent[new_state] = new_blank
+                    else:
+                        waiting[new_state] = new_blank
+                        heapq.heappush(heap, (temp_g + weight * h_score[new_state], -temp_g, new_state, new_blank))
+
+                if stats is not None:
+                    stats.frontier(len(waiting))
+                    stats.closed(len(closed))
+
+            if goal not in g_score:
+                break   # the open list ran out, which is_solvable should rule out
+
+            if not stopped:
+                proven_weight = weight
+
+            # the lowest g + h still waiting is a lower bound of the optimal solution
+            lowest = min((g_score[state] + h_score[state] for state in (*waiting, *inconsistent)),
+                         default=goal_g)
+            bound = 1.0 if not stopped and weight == 1 else max(1.0, min(proven_weight, goal_g / max(lowest, 1)))
+
+            if best is None or (goal_g, bound) < best:
+                best = (goal_g, bound)
+                yield moves_taken(origin, goal), bound
+
+            if bound == 1.0 or stopped:
+                break
+
+            # repair: lower the weight, move the inconsistent states back to the open list
+            # and sort it again with the new weight
+            weight = max(1.0, weight - weight_step)
+            waiting.update(inconsistent)
+            inconsistent.clear()
+            closed.clear()
+            heap = [(g_score[state] + weight * h_score[state], -g_score[state], state, blank)
+                    for state, blank in waiting.items()]
+            heapq.heapify(heap)
+    finally:
+        # also runs when the caller stops iterating early
+        if stats is not None:
+            stats.finish()
+
+
+NO_COST = 1 << 62   # cost of the incumbent of parallel_a_star before a solution is found
+
+
+def hda_owner(state: int, workers: int) -> int:
+    """
+    The worker of parallel_a_star that owns a state. The packed state is mixed
+    with a multiplicative hash first, so boards that differ in a few tiles
+    still go to different workers.
+
+    Args:
+        state (int): The packed configuration of the board
+        workers (int): Number of workers
+
+    Returns:
+        int: The index of the worker
+    """
+    return (((state * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32) % workers
+
+
+def hda_worker(rank: int, workers: int, goal_state: list, heuristic, inboxes: list, reports,
+               incumbent, sent, received, idle, done, batch: int) -> None:
+    """
+    One worker of parallel_a_star. It runs A* on the states it owns and sends the
+    children owned by the other workers to their inboxes in batches.
+
+    Args:
+        rank (int): The index of this worker
+        workers (int): Number of workers
+        goal_state (list): The goal configuration of the board
+        heuristic: The heuristic function
+        inboxes (list): The queue of every worker, nodes arrive as lists of
+                        (g, h, state, blank, moves so far)
+        reports: Queue the worker puts its report in when the search is done
+        incumbent: Shared cost of the best solution found by any worker
+        sent (Array): Batches sent by every worker (the last entry is the coordinator)
+        received (Array): Batches received by every worker
+        idle (Array): 1 for the workers that have nothing to do
+        done (Event): Set by the coordinator when the search is over
+        batch (int): Number of nodes sent to another worker at once
+    """
+    goal = encode_state(goal_state)
+    table = INCREMENTAL_TABLES[heuristic](goal_state) if heuristic in INCREMENTAL_TABLES else None
+    inbox = inboxes[rank]
+
+    open_heap = []  # (f, -g, state, blank, h, moves)
+    g_score = {}
+    closed = set()
+    outboxes = [[] for _ in range(workers)]
+    best = None     # (cost, moves) of the best solution this worker found
+    expanded = generated = duplicates = 0
+
+    def receive(nodes: list) -> None:
+        nonlocal duplicates
+        for g, h, state, blank_tile, moves in nodes:
+            # the nodes are not expanded in global f order, so a closed state can get a smaller g
+            if g >= g_score.get(state, NO_COST):
+                duplicates += 1
+                continue
+            g_score[state] = g
+            closed.discard(state)
+            heapq.heappush(open_heap, (g + h, -g, state, blank_tile, h, moves))
+
+    def send(owner: int) -> None:
+        sent[rank] += 1     # counted before it is in flight, so the coordinator never misses it
+        inboxes[owner].put(outboxes[owner])
+        outboxes[owner] = []
+
+    def flush() -> None:
+        for owner in range(workers):
+            if outboxes[owner]:
+                send(owner)
+
+    while not done.is_set():
+        # take everything that arrived
+        while True:
+            try:
+                nodes = inbox.get_nowait()
+            except queue.Empty:
+                break
+            idle[rank] = 0
+            receive(nodes)
+            received[rank] += 1
+
+        if not open_heap or open_heap[0][0] >= incumbent.value:
+            # nothing here can beat the incumbent: send what is left and wait
+            flush()
+            idle[rank] = 1
+            try:
+                nodes = inbox.get(timeout=0.005)
+            except queue.Empty:
+                continue
+            idle[rank] = 0
+            receive(nodes)
+            received[rank] += 1
+            continue
+
+        idle[rank] = 0
+
+        # expand a few nodes between two looks at the inbox
+        for _ in range(64):
+            if not open_heap or open_heap[0][0] >= incumbent.value:
+                break
+
+            f, g, state, blank_tile, h, moves = heapq.heappop(open_heap)
+            g = -g
+            if state in closed or g > g_score[state]:
+                duplicates += 1
+                continue
+
+            if state == goal:
+                with incumbent.get_lock():
+                    if g < incumbent.value:
+                        incumbent.value = g
+                if best is None or g < best[0]:
+                    best = (g, moves)
+                continue
+
+            closed.add(state)
+            expanded += 1
+            undo = INVERSE.get(moves[-1]) if moves else None
+
+            for move, new_state, new_blank, tile in expand(state, blank_tile):
+                if move == undo:
+                    continue
+                generated += 1
+
+                if table is not None:
+                    new_h = h + heuristic_delta(table, tile, new_blank, blank_tile)
+                else:
+                    new_h = heuristic(decode_state(new_state, SIZE), goal_state)
+                if g + 1 + new_h >= incumbent.value:
+                    continue    # can't lead to a better solution
+
+                node = (g + 1, new_h, new_state, new_blank, moves + move)
+                owner = hda_owner(new_state, workers)
+                if owner == rank:
+                    receive([node])
+                else:
+                    outboxes[owner].append(node)
+                    if len(outboxes[owner]) >= batch:
+                        send(owner)
+
+        flush()
+
+    # the lowest f left proves that no better solution was missed
+    lowest = min((f for f, g, state, _, _, _ in open_heap if state not in closed and -g == g_score[state]),
+                 default=NO_COST)
+    reports.put((rank, best, lowest, expanded, generated, duplicates, len(g_score)))
+
+
+def parallel_a_star(initial_state: list, goal_state: list, heuristic, workers: int | None = None,
+                    stats: SearchStats | None = None, batch: int = 256) -> list | None:
+    """
+    Hash Distributed A* (HDA*). Every state is owned by one worker process, picked by
+    hashing the packed state. Each worker keeps the open and closed lists of its own
+    states and sends the children it generates to their owners, so one hard board is
+    searched by every core.
+
+    The workers don't expand the nodes in global f order, so a worker can find a
+    solution before the optimal one: the cost of the best solution so far (the incumbent)
+    is shared and the nodes that can't beat it are pruned. The search is over when every
+    worker has nothing below the incumbent left and no batch is in flight. The coordinator
+    checks this by reading the sent and received counters, then the idle flags, then the
+    counters again. When it is over, every worker reports the lowest f it has left; the
+    solution is only returned if none of them is below its cost, which proves it is optimal.
+
+    Args:
+        initial_state (list): The initial configuration of the board
+        goal_state (list): The goal configuration of the board
+        heuristic: The heuristic function or its name in HEURISTICS (admissible)
+        workers (int): Number of worker processes, defaults to the number of CPUs
+        stats (SearchStats): If given, it is filled in with the counters of all the workers
+        batch (int): Number of nodes sent to another worker at once
+
+    Returns:
+        list: A list with the moves applied to reach the goal or None if there is no solution
+    """
+    heuristic = resolve_heuristic(heuristic)
+    check_admissible(heuristic, "HDA*")
+    workers = workers or os.cpu_count() or 1
+
+    if not is_solvable(initial_state, goal_state, WIDTH):
+        if stats is not None:
+            stats.finish()
+        return None
+
+    inboxes = [multiprocessing.Queue() for _ in range(workers)]
+    reports = multiprocessing.Queue()
+    incumbent = multiprocessing.Value('q', NO_COST)
+    # every entry is written by one process only, so they need no lock
+    sent = multiprocessing.Array('q', workers + 1, lock=False)
+    received = multiprocessing.Array('q', workers, lock=False)
+    idle = multiprocessing.Array('b', workers, lock=False)
+    done = multiprocessing.Event()
+
+    start = encode_state(initial_state)
+    table = INCREMENTAL_TABLES[heuristic](goal_state) if heuristic in INCREMENTAL_TABLES else None
+    h = heuristic_value(table, initial_state) if table is not None else heuristic(initial_state, goal_state)
+    sent[workers] += 1
+    inboxes[hda_owner(start, workers)].put([(0, h, start, initial_state.index(0), "")])
+
+    processes = [
+        multiprocessing.Process(target=hda_worker, args=(rank, workers, goal_state, heuristic, inboxes, reports,
+                                                         incumbent, sent, received, idle, done, batch))
+        for rank in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def check_workers(running: bool) -> None:
+        # a worker only stops on its own once done is set, and then with exit code 0 after its report,
+        # so any other exit (an exception, the OOM killer) would leave the search waiting forever
+        for rank, process in enumerate(processes):
+            if process.exitcode is not None and (running or process.exitcode != 0):
+                raise RuntimeError(f"HDA* worker {rank} stopped with exit code {process.exitcode}")
+
+    try:
+        while True:
+            time.sleep(0.001)
+            check_workers(running=True)
+            counters = (sum(sent), sum(received))
+            if counters[0] == counters[1] and all(idle) and counters == (sum(sent), sum(received)):
+                break
+
+        done.set()
+        results = []
+        while len(results) < workers:
+            try:
+                results.append(reports.get(timeout=0.1))
+            except queue.Empty:
+                check_workers(running=False)
+    finally:
+        done.set()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    solutions = [best for _, best, _, _, _, _, _ in results if best is not None]
+    lowest = min(lowest for _, _, lowest, _, _, _, _ in results)
+
+    if stats is not None:
+        for _, _, _, expanded, generated, duplicates, kept in results:
+            stats.nodes_expanded += expanded
+            stats.nodes_generated += generated
+            stats.duplicates += duplicates
+            stats.peak_closed += kept
+        stats.finish()
+
+    if not solutions:
+        return None
+
+    cost, moves = min(solutions)
+    if lowest < cost:
+        raise RuntimeError(f"HDA* stopped with a node of f = {lowest} below the solution cost {cost}")
+
+    return list(moves)
+
+
+def parse_state(raw: str) -> list:
+    """
+    Turn a string like "4,1,0,2,5,3,6,8,7" into a board, the same way user_input does
+
+    Args:
+        raw (str): The board as text
+
+    Returns:
+        list: A list of unique integers between 0 and 8
+
+    Raises:
+        ValueError: if the text is not a valid board
+    """
+    state = list(map(int, raw.replace(",", " ").split()))
+
+    if len(state) != 9:
+        raise ValueError("Enter 9 integers exactly.")
+    if set(state) != set(range(9)):
+        raise ValueError("Enter integers between 0 and 9, no duplicates allowed.")
+
+    return state
+
+
+def read_instances(lines):
+    """
+    Read start/goal pairs, one per line, separated by a semicolon
+    (e.g. "4,1,0,2,5,3,6,8,7; 1,2,3,4,5,6,7,8,0"). Empty lines and lines
+    starting with # are skipped. The lines are read lazily so huge files
+    are never loaded at once.
+
+    Args:
+        lines: An iterable of lines, like an open file or sys.stdin
+
+    Yields:
+        tuple: (start state, goal state)
+
+    Raises:
+        ValueError: if a line is not a valid pair of boards
+    """
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        try:
+            start, goal = line.split(";")
+            yield parse_state(start), parse_state(goal)
+        except ValueError as e:
+            raise ValueError(f"line {line_no}: {e}") from None
+
+
+def solve_one(start: list, goal: list, heuristic, stats: SearchStats | None = None,
+              open_list=HeapOpenList, weight: float | None = None, time_limit: float | None = None,
+              max_nodes: int | None = None, cache: SolutionCache | None = None) -> tuple:
+    """
+    Solve one board with a_star, or with anytime_a_star if there is a time limit
+
+    Args:
+        start (list): The initial configuration of the board
+        goal (list): The goal configuration of the board
+        heuristic: The heuristic function or its name in HEURISTICS
+        stats (SearchStats): If given, it is filled in with the counters and timers of the search
+        open_list: The class of the open list passed to a_star
+        weight (float): The weight of h(n), the first weight of anytime_a_star.
+                        Defaults to 1 (optimal) for a_star and ANYTIME_WEIGHT for anytime_a_star
+        time_limit (float): If given, anytime_a_star runs for at most this many seconds
+        max_nodes (int): Memory budget of a_star, see a_star
+        cache (SolutionCache): If given, a_star answers are looked up there first and
+                               cached (anytime answers depend on the time, so they are not)
+
+    Returns:
+        tuple: (moves, suboptimality bound), (None, None) if no solution was found
+    """
+    heuristic = resolve_heuristic(heuristic)
+
+    if time_limit is not None and (open_list is not HeapOpenList or max_nodes is not None):
+        # anytime_a_star repairs its own heap and keeps every state it has seen
+        raise ValueError("Anytime A* supports neither another open list nor a memory budget")
+
+    if weight is None:
+        weight = ANYTIME_WEIGHT if time_limit is not None else 1
+
+    if time_limit is None:
+        if cache is None:
+            moves = a_star(start, goal, heuristic, stats, open_list=open_list, weight=weight, max_nodes=max_nodes)
+        else:
+            # the weight changes the answer, and the budget can make a solvable board fail
+            solver = f"a_star/{heuristic.__name__}/w{weight:g}/n{max_nodes}"
+            moves = cache.solve(solver, a_star, start, goal, WIDTH, heuristic, stats,
+                                open_list=open_list, weight=weight, max_nodes=max_nodes)
+            if cache.last_hit and stats is not None:
+                stats.finish()  # still write the stats of the query, with nothing searched
+        return (moves, float(weight)) if moves is not None else (None, None)
+
+    moves = bound = None
+    for moves, bound in anytime_a_star(start, goal, heuristic, weight=weight, time_limit=time_limit, stats=stats):
+        pass
+
+    return moves, bound
+
+
+worker_caches = {}  # path -> the SolutionCache of this process, opened once per worker
+
+
+def solve_chunk(chunk: list, heuristic, stats_sink: str | None = None, options: dict | None = None,
+                cache_path: str | None = None) -> list:
+    """
+    Solve a chunk of instances in a worker process
+
+    Args:
+        chunk (list): A list of (index, (start state, goal state))
+        heuristic: The heuristic function or its name in HEURISTICS
+        stats_sink (str): If given, the stats of every search are appended to this file as JSON lines
+        options (dict): Keyword arguments of solve_one (open_list, weight, time_limit, max_nodes)
+        cache_path (str): If given, the solutions are cached in this SQLite file
+
+    Returns:
+        list: A list of (index, moves or None, suboptimality bound or None)
+    """
+    heuristic = resolve_heuristic(heuristic)
+    options = options or {}
+    if cache_path is not None:
+        if cache_path not in worker_caches:
+            worker_caches[cache_path] = SolutionCache(path=cache_path)
+        options = dict(options, cache=worker_caches[cache_path])
+
+    results = []
+
+    for index, (start, goal) in chunk:
+        stats = SearchStats(f"a_star/{heuristic.__name__}", stats_sink) if stats_sink is not None else None
+        results.append((index, *solve_one(start, goal, heuristic, stats, **options)))
+
+    return results
+
+
+def solve_many(instances, heuristic, workers: int | None = None, chunksize: int = 64, ordered: bool = True,
+               stats_sink: str | None = None, cache_path: str | None = None, **options):
+    """
+    Solve many boards with a_star on a pool of processes. The instances are
+    sent to the workers in chunks and only a few chunks per worker are in flight
+    at a time, so the instances can come from a generator of any size.
+
+    Args:
+        instances: An iterable of (start state, goal state)
+        heuristic: The name of the heuristic in HEURISTICS, or a picklable heuristic function
+        workers (int): Number of worker processes, defaults to the number of CPUs
+        chunksize (int): Number of instances sent to a worker at once
+        ordered (bool): Yield the results in the order of the instances if True,
+                        else as soon as each chunk is done
+        stats_sink (str): If given, the stats of every search are appended to this file as JSON lines
+        cache_path (str): If given, the solutions are cached in this SQLite file, shared by the workers
+        **options: Keyword arguments of solve_one (open_list, weight, time_limit, max_nodes)
+
+    Yields:
+        tuple: (index of the instance, moves or None if there is no solution,
+                proven suboptimality bound of the moves or None)
+    """
+    numbered = enumerate(instances)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers # chunks waiting in the pool at once
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()   # futures in the order they were submitted
+
+        def submit_next() -> bool:
+            chunk = list(islice(numbered, chunksize))
+            if not chunk:
+                return False
+            pending.append(executor.submit(solve_chunk, chunk, heuristic, stats_sink, options, cache_path))
+            return True
+
+        while len(pending) < max_in_flight and submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [future for future in pending if future in finished]
+                for future in done:
+                    pending.remove(future)
+
+            for future in done:
+                yield from future.result()
+                submit_next()
+
+
+def batch_main(args) -> None:
+    """
+    Solve the boards in a file (or stdin) and print one line per board:
+    the index of the board and the moves (with their suboptimality bound if they
+    may not be optimal), or "No solution"
+
+    Args:
+        args: The parsed command line arguments
+    """
+    file = sys.stdin if args.batch == "-" else open(args.batch)
+
+    try:
+        if args.hda is not None:
+            # one board at a time, each one searched by all the processes
+            results = (
+                (index, moves, None if moves is None else 1.0)
+                for index, (start, goal) in enumerate(read_instances(file))
+                for moves in [parallel_a_star(start, goal, args.heuristic, workers=args.hda,
+                                              stats=SearchStats("parallel_a_star", args.stats)
+                                              if args.stats is not None else None)]
+            )
+        else:
+            results = solve_many(read_instances(file), args.heuristic,
+                                 workers=args.workers, chunksize=args.chunksize,
+                                 ordered=not args.unordered, stats_sink=args.stats,
+                                 open_list=OPEN_LISTS[args.open_list], weight=args.weight,
+                                 time_limit=args.anytime, max_nodes=args.max_nodes, cache_path=args.cache)
+        for index, result, bound in results:
+            if result is None:
+                print(f"{index}: No solution")
+            elif bound > 1:
+                print(f"{index}: {' '.join(result)} (at most {bound:.3f} x optimal)")
+            else:
+                print(f"{index}: {' '.join(result)}")
+    except ValueError as e:
+        print(f"Invalid input: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if file is not sys.stdin:
+            file.close()
 
 
 def user_input(prompt: str) -> list:
@@ -242,72 +1798,109 @@ def user_input(prompt: str) -> list:
 
 
 def main() -> None:
-    
+
+    parser = argparse.ArgumentParser(description="8-puzzle solved with A*")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="solve the start/goal pairs in FILE (- for stdin) instead of the menu")
+    parser.add_argument("--heuristic", choices=HEURISTICS, default="md")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all CPUs)")
+    parser.add_argument("--chunksize", type=int, default=64, help="boards sent to a process at once")
+    parser.add_argument("--unordered", action="store_true", help="print results as soon as they are done")
+    parser.add_argument("--stats", metavar="FILE", help="append the stats of every search to FILE as JSON lines")
+    parser.add_argument("--open-list", choices=OPEN_LISTS, default="heap", help="open list used by A*")
+    parser.add_argument("--weight", type=float, default=None,
+                        help="weight of h(n), > 1 trades solution length for speed "
+                             f"(default: 1, optimal, or {ANYTIME_WEIGHT:g} with --anytime)")
+    parser.add_argument("--anytime", type=float, metavar="SECONDS",
+                        help="run anytime A* for at most SECONDS per board, starting from --weight")
+    parser.add_argument("--max-nodes", type=int, metavar="N",
+                        help="memory budget of A*, it falls back to SMA* once it stores more than N states")
+    parser.add_argument("--cache", metavar="FILE", help="cache the solutions in the SQLite file FILE")
+    parser.add_argument("--hda", type=int, metavar="N",
+                        help="solve every board with parallel A* (HDA*) on N processes")
+    args = parser.parse_args()
+
+    if args.anytime is not None and (args.open_list != "heap" or args.max_nodes is not None):
+        parser.error("--anytime can't be combined with --open-list bucket or --max-nodes")
+
+    if args.hda is not None:
+        # parallel_a_star is optimal A* with its own open lists, one board at a time on --hda processes
+        ignored = [flag for flag, value in (("--weight", args.weight), ("--anytime", args.anytime),
+                                            ("--max-nodes", args.max_nodes), ("--cache", args.cache),
+                                            ("--workers", args.workers))
+                   if value is not None]
+        if args.open_list != "heap":
+            ignored.append("--open-list")
+        if args.chunksize != parser.get_default("chunksize"):
+            ignored.append("--chunksize")
+        if args.unordered:
+            ignored.append("--unordered")
+        if ignored:
+            parser.error(f"--hda can't be combined with {', '.join(ignored)}")
+        if args.hda < 1:
+            parser.error("--hda needs at least 1 process")
+
+    if args.batch is not None:
+        batch_main(args)
+        return
+
     initial_state = user_input("Enter the 8-puzzle start state: (e.g. 4,1,0,2,5,3,6,8,7):")
     goal_state = user_input("Enter the 8-puzzle goal state (e.g. 1,2,3,4,5,,6,7,8,0):")
+    cache = SolutionCache()  # so asking for the same board twice does not search again
+
+    names = list(HEURISTICS)  # one option per heuristic of the registry, then the rest
+    new_start = str(len(names) + 1)
+    new_goal = str(len(names) + 2)
+    leave = str(len(names) + 3)
 
     while True:
         print("\nMenu:")
-        print("[1] MD")
-        print("[2] OOP")
-        print("[3] New start state")
-        print("[4] New goal state")
-        print("[5] Exit")
+        for number, name in enumerate(names, 1):
+            print(f"[{number}] {HEURISTICS[name].label}")
+        print(f"[{new_start}] New start state")
+        print(f"[{new_goal}] New goal state")
+        print(f"[{leave}] Exit")
 
         choice = input("\nChoose an option: ")
 
-        # MD
-        if choice == "1":
+        # A* with one of the heuristics
+        if choice.isdigit() and 1 <= int(choice) <= len(names):
+            heuristic = HEURISTICS[names[int(choice) - 1]]
             starttime = timeit.default_timer()
             print("============================================")
-            print("The start time is :",starttime)
-
-            result = a_star(initial_state, goal_state, manhattan_distance)
-            
-            if result == None:
-                print("No solution")
-            else:
-                print("Sequence of moves (MD):", end=" ")
-                print(*result)
-                print(f"No. of steps: {len(result)}\n")
-            
-            print("Time taken:", timeit.default_timer() - starttime)
-            print("============================================")
 
-        # OOP
-        elif choice == "2":
-            starttime = timeit.default_timer()
-            print("============================================")
-            # print("The start time is :",starttime)            
-            result = a_star(initial_state, goal_state, out_of_place_tiles)
+            solver = f"a_star/{heuristic.function.__name__}"
+            stats = SearchStats(solver)
+            result = cache.solve(solver, a_star, initial_state, goal_state, WIDTH,
+                                 heuristic.function, stats=stats)
 
             if result is None:
                 print("No solution.")
             else:
-                print("Sequence of moves (OOP):", end=" ")
+                print(f"Sequence of moves ({heuristic.label}):", end=" ")
                 print(*result)
                 print(f"No. of steps: {len(result)}\n")
 
-            print("Time taken:", timeit.default_timer() - starttime)   
-            print("============================================")             
+            print("Time taken:", timeit.default_timer() - starttime)
+            print("Found in the cache" if cache.last_hit else stats)
+            print("============================================")
 
         # New initial state
-        elif choice == "3":
+        elif choice == new_start:
             initial_state =  user_input("Enter the state of the board (e.g. 4,1,0,2,5,3,6,8,7):")
 
         # New goal state
-        elif choice == "4":
+        elif choice == new_goal:
             goal_state = user_input("Enter the goal state (e.g. 1,2,3,4,5,6,7,8,0):")
 
         # Exit
-        elif choice == "5":
+        elif choice == leave:
             print("Bye Bye")
             break
 
         else:
-            print("Invalid choice. Please choose between 1-5")
+            print(f"Invalid choice. Please choose between 1-{leave}")
 
 
 if __name__ == "__main__":
     main()
-        
@@ -0,0 +1,384 @@
+#! /usr/bin/env python
+
+"""
+External memory (disk backed) Breadth First Search for sliding tile puzzles of up to 16 cells (4x4).
+
+Only the current layer is expanded at a time, and no layer is ever held in memory:
+*every layer is a file of packed boards (4 bits per tile, one 8 byte integer per board), sorted
+*the children of a layer are collected in memory until the RAM budget is used up,
+ then sorted and written to a run file
+*the run files are merged, and the boards that are in the layer being expanded or the one
+ before it are dropped while merging. A move can be undone, so a child can't be older than that.
+
+This way the search can enumerate a whole state space that doesn't fit in memory, e.g. to
+get the number of boards at every distance from the goal and the hardest boards.
+"""
+
+import argparse
+import heapq
+import mmap
+import os
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+
+if __package__ in (None, ""):
+    # started as a script (python bejleri_3/external_bfs.py) instead of with python -m: the packages
+    # and the shared modules live at the top of the repo
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bejleri_3.sliding_puzzle import build_neighbors, is_solvable, encode_state, decode_state, INVERSE, BITS, MASK
+
+BLOCK = 1 << 16         # boards read or written at once
+BYTES_PER_STATE = 100   # memory a board takes while a run is collected and sorted (int, set entry, list entry)
+MAX_OPEN_RUNS = 64      # run files merged at once, more are merged in several passes
+DEFAULT_RAM_MB = 256
+
+
+def read_states(path: str):
+    """
+    Read the boards of a file a block at a time
+
+    Args:
+        path (str): A layer or run file
+
+    Yields:
+        int: The packed boards, in the order of the file
+    """
+    with open(path, "rb") as file:
+        while True:
+            block = array('Q')
+            try:
+                block.fromfile(file, BLOCK)
+            except EOFError:    # the last block, the boards that were there are still read
+                yield from block
+                return
+            yield from block
+
+
+def write_states(path: str, states) -> int:
+    """
+    Write boards to a file a block at a time
+
+    Args:
+        path (str): The file to write
+        states: An iterable of packed boards
+
+    Returns:
+        int: The number of boards written
+    """
+    count = 0
+
+    with open(path, "wb") as file:
+        block = array('Q')
+        for state in states:
+            block.append(state)
+            if len(block) == BLOCK:
+                block.tofile(file)
+                count += len(block)
+                block = array('Q')
+        block.tofile(file)
+        count += len(block)
+
+    return count
+
+
+def unique(states):
+    """Drop the repeated boards of a sorted stream"""
+    previous = None
+
+    for state in states:
+        if state != previous:
+            yield state
+            previous = state
+
+
+def difference(states, *others):
+    """
+    The boards of a sorted stream that are in none of the other sorted streams
+
+    Args:
+        states: A sorted iterable of boards
+        *others: Sorted iterables of boards to drop
+
+    Yields:
+        int: The boards that are left, sorted
+    """
+    others = [iter(other) for other in others]
+    heads = [next(other, None) for other in others]
+
+    for state in states:
+        duplicate = False
+        for i, other in enumerate(others):
+            while heads[i] is not None and heads[i] < state:
+                heads[i] = next(other, None)
+            if heads[i] == state:
+                duplicate = True
+        if not duplicate:
+            yield state
+
+
+def blank_of(code: int, size: int) -> int:
+    """
+    Args:
+        code (int): A packed board
+        size (int): Number of cells on the board
+
+    Returns:
+        int: The cell of the blank tile
+    """
+    for cell in range(size):
+        if (code >> (BITS * cell)) & MASK == 0:
+            return cell
+
+    raise ValueError("The board has no blank tile")
+
+
+def write_runs(layer: str, neighbors: tuple, size: int, workdir: str, budget: int) -> list:
+    """
+    Expand a layer and write its children to sorted run files of at most budget boards
+
+    Args:
+        layer (str): The file of the layer to expand
+        neighbors (tuple): The moves of every blank position, from build_neighbors
+        size (int): Number of cells on the board
+        workdir (str): Directory of the run files
+        budget (int): Most boards kept in memory at once
+
+    Returns:
+        list: The paths of the run files
+    """
+    runs = []
+    children = set()    # a set, so the repeats within a run are dropped right away
+
+    def flush() -> None:
+        path = os.path.join(workdir, f"run_{len(runs)}.bin")
+        write_states(path, sorted(children))
+        runs.append(path)
+        children.clear()
+
+    for code in read_states(layer):
+        blank_tile = blank_of(code, size)
+        for _, tile_pos in neighbors[blank_tile]:
+            tile = (code >> (BITS * tile_pos)) & MASK
+            children.add(code ^ (tile << (BITS * tile_pos)) ^ (tile << (BITS * blank_tile)))
+
+        if len(children) >= budget:
+            flush()
+
+    if children or not runs:
+        flush()
+
+    return runs
+
+
+def merge_runs(runs: list, workdir: str) -> list:
+    """
+    Merge run files until at most MAX_OPEN_RUNS are left, so they can all be open at once
+
+    Args:
+        runs (list): The paths of the sorted run files
+        workdir (str): Directory of the run files
+
+    Returns:
+        list: The paths of the run files left
+    """
+    passes = 0
+
+    while len(runs) > MAX_OPEN_RUNS:
+        merged = []
+        for i in range(0, len(runs), MAX_OPEN_RUNS):
+            group = runs[i:i + MAX_OPEN_RUNS]
+            path = os.path.join(workdir, f"merge_{passes}_{i}.bin")
+            write_states(path, unique(heapq.merge(*(read_states(run) for run in group))))
+            for run in group:
+                os.remove(run)
+            merged.append(path)
+        runs = merged
+        passes += 1
+
+    return runs
+
+
+def layer_path(workdir: str, depth: int) -> str:
+    return os.path.join(workdir, f"layer_{depth}.bin")
+
+
+def layered_bfs(starts: list, width: int, size: int, workdir: str, ram_budget: int = DEFAULT_RAM_MB << 20,
+                report=None, target: int | None = None, keep_layers: bool = False) -> list:
+    """
+    Breadth First Search from a set of packed boards, one layer file at a time
+
+    Args:
+        starts (list): The packed boards of layer 0
+        width (int): Number of columns on the board
+        size (int): Number of cells on the board
+        workdir (str): Directory of the layer and run files
+        ram_budget (int): Bytes of memory the boards of a run may use
+        report: If given, report(depth, number of boards, seconds) is called after every layer
+        target (int): If given, the search stops at the layer that holds this board
+        keep_layers (bool): Keep every layer file, else only the last two are kept
+
+    Returns:
+        list: The number of boards of every layer, the last layer is the one
+              that holds the target (if one was given) or the last one that is not empty
+    """
+    neighbors = build_neighbors(width, size)
+    budget = max(1, ram_budget // BYTES_PER_STATE)
+
+    sizes = [write_states(layer_path(workdir, 0), sorted(set(starts)))]
+    if report is not None:
+        report(0, sizes[0], 0.0)
+    if target is not None and target in starts:
+        return sizes
+
+    depth = 0
+    found = False
+
+    while True:
+        started = time.perf_counter()
+        runs = merge_runs(write_runs(layer_path(workdir, depth), neighbors, size, workdir, budget), workdir)
+
+        # a child is either new or in this layer or the one before (the parent's parent)
+        older = [read_states(layer_path(workdir, depth))]
+        if depth > 0:
+            older.append(read_states(layer_path(workdir, depth - 1)))
+        new_states = difference(unique(heapq.merge(*(read_states(run) for run in runs))), *older)
+
+        if target is not None:
+            def watch(states):
+                nonlocal found
+                for state in states:
+                    found = found or state == target
+                    yield state
+            new_states = watch(new_states)
+
+        count = write_states(layer_path(workdir, depth + 1), new_states)
+
+        for run in runs:
+            os.remove(run)
+        if not keep_layers and depth > 0:
+            os.remove(layer_path(workdir, depth - 1))
+
+        if count == 0:
+            os.remove(layer_path(workdir, depth + 1))
+            return sizes
+
+        depth += 1
+        sizes.append(count)
+        if report is not None:
+            report(depth, count, time.perf_counter() - started)
+        if found:
+            return sizes
+
+
+def contains(path: str, code: int) -> bool:
+    """
+    Binary search for a board in a sorted layer file, without reading the whole file
+
+    Args:
+        path (str): The layer file
+        code (int): The packed board
+
+    Returns:
+        bool: True if the board is in the layer
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        states = memoryview(mapped).cast('Q')
+        try:
+            index = bisect_left(states, code)
+            return index < len(states) and states[index] == code
+        finally:
+            states.release()
+
+
+def external_bfs(initial_state: list, goal_state: list, width: int, workdir: str | None = None,
+                 ram_budget: int = DEFAULT_RAM_MB << 20, report=None) -> list | None:
+    """
+    Solve a board with the external memory BFS. The layers are kept on disk and
+    the path is found afterwards by going back from the goal through the layers,
+    looking each parent up in its layer file.
+
+    Args:
+        initial_state (list): The initial configuration of the board
+        goal_state (list): The goal configuration of the board
+        width (int): Number of columns on the board
+        workdir (str): Directory for the layer files, a temporary one if None
+        ram_budget (int): Bytes of memory the boards of a run may use
+        report: If given, report(depth, number of boards, seconds) is called after every layer
+
+    Returns:
+        list: The moves applied to reach the goal or None if there is no solution
+    """
+    size = len(initial_state)
+    if size > 64 // BITS:
+        raise ValueError(f"Boards of more than {64 // BITS} cells don't fit in 64 bits")
+    if not is_solvable(initial_state, goal_state, width):
+        return None
+
+    neighbors = build_neighbors(width, size)
+    goal = encode_state(goal_state)
+
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        sizes = layered_bfs([encode_state(initial_state)], width, size, directory, ram_budget,
+                            report=report, target=goal, keep_layers=True)
+
+        moves = []
+        code = goal
+
+        for depth in range(len(sizes) - 2, -1, -1):
+            blank_tile = blank_of(code, size)
+            for move, tile_pos in neighbors[blank_tile]:
+                # move slides a tile from tile_pos into the blank, which goes back one step
+                tile = (code >> (BITS * tile_pos)) & MASK
+                parent = code ^ (tile << (BITS * tile_pos)) ^ (tile << (BITS * blank_tile))
+                if contains(layer_path(directory, depth), parent):
+                    moves.append(INVERSE[move])
+                    code = parent
+                    break
+
+    return list(reversed(moves))
+
+
+def print_layer(depth: int, count: int, seconds: float) -> None:
+    print(f"depth {depth:>3}: {count:>12} boards  ({seconds:.2f}s)", flush=True)
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Distance of every board from the goal, with an external memory BFS")
+    parser.add_argument("--width", type=int, default=3, help="number of columns (default: 3)")
+    parser.add_argument("--height", type=int, default=3, help="number of rows (default: 3)")
+    parser.add_argument("--goal", help="the goal board, e.g. 1,2,3,4,5,6,7,8,0 (default: the tiles in order)")
+    parser.add_argument("--ram-mb", type=int, default=DEFAULT_RAM_MB, help="memory budget of a run in MB")
+    parser.add_argument("--workdir", help="directory for the layer files (default: a temporary directory)")
+    parser.add_argument("--hardest", type=int, default=10, help="number of the hardest boards to print")
+    args = parser.parse_args()
+
+    size = args.width * args.height
+    if size > 64 // BITS:
+        parser.error(f"boards of more than {64 // BITS} cells are not supported")
+
+    goal = list(range(1, size)) + [0]
+    if args.goal is not None:
+        goal = list(map(int, args.goal.replace(",", " ").split()))
+        if sorted(goal) != list(range(size)):
+            parser.error(f"the goal must hold the integers 0 to {size - 1} once each")
+
+    starttime = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as directory:
+        sizes = layered_bfs([encode_state(goal)], args.width, size, directory, args.ram_mb << 20,
+                            report=print_layer)
+
+        print(f"\n{sum(sizes)} boards, the hardest need {len(sizes) - 1} moves")
+        for code in list(read_states(layer_path(directory, len(sizes) - 1)))[:args.hardest]:
+            print(*decode_state(code, size))
+
+    print("Time taken:", time.perf_counter() - starttime)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,537 @@
+#! /usr/bin/env python
+
+"""
+Sliding tile puzzle on a board of any size (3x2, 3x3, 4x4 and up), solved with IDA*.
+It also holds the helpers shared by the solvers in bejleri_3_1 and bejleri_3_2.
+
+A board is a list of the tiles read row by row, with 0 as the blank tile.
+The moves are named after the direction the tile slides into the blank:
+*Up = U
+*Down = D
+*Left = L
+*Right = R
+
+IDA* (iterative deepening A*) runs depth first searches bounded by f(n) = g(n) + h(n),
+raising the bound to the smallest f that went over it after every iteration.
+It only keeps the current path in memory, so it can solve 15-puzzle instances
+that make A* run out of memory.
+"""
+
+import argparse
+import timeit
+from functools import lru_cache
+from math import factorial
+
+INVERSE = {'L': 'R', 'R': 'L', 'U': 'D', 'D': 'U'}   # the move that undoes each move
+BITS = 4    # bits used to store one tile in a packed state
+MASK = 0xF  # mask to extract one tile from a packed state
+FOUND = -1  # returned by the IDA* search when the goal is reached
+
+
+def sort_and_count(tiles: list) -> tuple:
+    """
+    Merge sort that also counts the pairs of tiles that are in the wrong
+    order (the bigger tile comes first), so it takes O(n log n)
+
+    Args:
+        tiles (list): The tiles to check
+
+    Returns:
+        tuple: (the tiles sorted, the number of inversions)
+    """
+    if len(tiles) <= 1:
+        return tiles, 0
+
+    middle = len(tiles) // 2
+    left, left_inversions = sort_and_count(tiles[:middle])
+    right, right_inversions = sort_and_count(tiles[middle:])
+
+    merged = []
+    inversions = left_inversions + right_inversions
+    i = j = 0
+
+    while i < len(left) and j < len(right):
+        if left[i] <= right[j]:
+            merged.append(left[i])
+            i += 1
+        else:
+            # right[j] is smaller than every tile left in the left half
+            merged.append(right[j])
+            inversions += len(left) - i
+            j += 1
+
+    merged += left[i:] + right[j:]
+
+    return merged, inversions
+
+
+def count_inversions(tiles: list) -> int:
+    """
+    Count the pairs of tiles that are in the wrong order
+
+    Args:
+        tiles (list): The tiles to check
+
+    Returns:
+        int: The number of inversions
+    """
+    return sort_and_count(list(tiles))[1]
+
+
+def parity(state: list, width: int) -> int:
+    """
+    The invariant that no move can change: the parity of the inversions
+    (blank excluded) and, for even widths, of the row of the blank
+
+    Args:
+        state (list): A configuration of the board
+        width (int): Number of columns on the board
+
+    Returns:
+        int: 0 or 1
+    """
+    inversions = count_inversions([tile for tile in state if tile != 0])
+
+    # on odd widths an up/down move jumps over an even number of tiles, so the
+    # inversions keep their parity. On even widths it flips, and so does the row of the blank
+    if width % 2 == 0:
+        inversions += state.index(0) // width
+
+    return inversions % 2
+
+
+def is_solvable(initial_state: list, goal_state: list, width: int) -> bool:
+    """
+    Check if the goal configuration can be reached from the initial configuration.
+    Exactly half of the configurations can be reached, so the solvers call this
+    before searching instead of exploring half the state space for nothing.
+
+    Args:
+        initial_state (list): The initial configuration of the board
+        goal_state (list): The goal configuration of the board
+        width (int): Number of columns on the board
+
+    Returns:
+        bool: True if there is a solution, else False
+    """
+    return parity(initial_state, width) == parity(goal_state, width)
+
+
+def rank_permutation(state: list) -> int:
+    """
+    Number a board between 0 and n! - 1 (its position among all the
+    boards in lexicographic order), so boards can index a flat array
+
+    Args:
+        state (list): A configuration of the board
+
+    Returns:
+        int: The rank of the board
+    """
+    rank = 0
+    size = len(state)
+
+    for i in range(size):
+        # tiles after position i that are smaller than the tile at i
+        smaller = sum(1 for tile in state[i + 1:] if tile < state[i])
+        rank = rank * (size - i) + smaller
+
+    return rank
+
+
+def unrank_permutation(rank: int, size: int) -> list:
+    """
+    The board with the given rank, the inverse of rank_permutation
+
+    Args:
+        rank (int): The rank of the board
+        size (int): Number of cells on the board
+
+    Returns:
+        list: The configuration of the board
+    """
+    digits = []
+
+    for base in range(1, size + 1):
+        rank, digit = divmod(rank, base)
+        digits.append(digit)
+
+    tiles = list(range(size))
+
+    return [tiles.pop(digit) for digit in reversed(digits)]
+
+
+def encode_state(state: list) -> int:
+    """
+    Pack a board into a single integer, 4 bits per tile.
+    The tile at position i is stored in bits 4*i to 4*i + 3.
+
+    Args:
+        state (list): A configuration of the board
+
+    Returns:
+        int: The packed configuration
+    """
+    code = 0
+
+    for position, tile in enumerate(state):
+        code |= tile << (BITS * position)
+
+    return code
+
+
+def decode_state(code: int, size: int) -> list:
+    """
+    Unpack an integer made by encode_state back into a board
+
+    Args:
+        code (int): The packed configuration
+        size (int): Number of cells on the board
+
+    Returns:
+        list: The configuration of the board as a list
+    """
+    return [(code >> (BITS * position)) & MASK for position in range(size)]
+
+
+@lru_cache(maxsize=None)
+def build_neighbors(width: int, size: int) -> tuple:
+    """
+    Precompute, for every position of the blank tile, the moves that are
+    legal from there and the position of the tile that is swapped with the blank.
+    The table is made once per board shape, so the per-move helpers can call this freely.
+
+    Args:
+        width (int): Number of columns on the board
+        size (int): Number of cells on the board
+
+    Returns:
+        tuple: A tuple indexed by the blank position with ((move, tile), ...) pairs
+    """
+    neighbors = []
+
+    for blank_tile in range(size):
+        moves = []
+
+        if blank_tile % width != width - 1:
+            moves.append(('L', blank_tile + 1))
+        if blank_tile % width != 0:
+            moves.append(('R', blank_tile - 1))
+        if blank_tile >= width:
+            moves.append(('D', blank_tile - width))
+        if blank_tile < size - width:
+            moves.append(('U', blank_tile + width))
+
+        neighbors.append(tuple(moves))
+
+    return tuple(neighbors)
+
+
+def successor_table(width: int, size: int, move_order: str = "LRDU") -> tuple:
+    """
+    Same as build_neighbors, with the moves of every blank position in the given order
+
+    Args:
+        width (int): Number of columns on the board
+        size (int): Number of cells on the board
+        move_order (str): The order in which the moves are listed
+
+    Returns:
+        tuple: A tuple indexed by the blank position with ((move, tile), ...) pairs
+    """
+    return tuple(
+        tuple(sorted(moves, key=lambda pair: move_order.index(pair[0])))
+        for moves in build_neighbors(width, size)
+    )
+
+
+def get_valid_moves(state: list, width: int) -> list:
+    """
+    Get the valid moves depending on the current state
+
+    Args:
+        state (list): Current state of the board
+        width (int): Number of columns on the board
+
+    Returns:
+        list: A list with the valid moves
+    """
+    blank_tile = state.index(0)
+
+    return [move for move, _ in build_neighbors(width, len(state))[blank_tile]]
+
+
+def move_tile(state: list, action: str, width: int) -> list | None:
+    """
+    Swap the blank tile (0) with a legal tile depending on the action
+
+    Args:
+        state (list): Current state of the board
+        action (str): Action to apply
+        width (int): Number of columns on the board
+
+    Returns:
+        list: New board state after the move or None if the move is not legal
+    """
+    blank_tile = state.index(0)
+
+    for move, tile in build_neighbors(width, len(state))[blank_tile]:
+        if move == action:
+            new_state = state.copy()
+            (new_state[tile], new_state[blank_tile]) = (new_state[blank_tile], new_state[tile])
+            return new_state
+
+    return None
+
+
+def distance_table(goal: list, width: int) -> list:
+    """
+    Manhattan distance of every tile from its goal cell, for every cell it can be on.
+    table[tile][cell] is 0 for the blank.
+
+    Args:
+        goal (list): The goal configuration of the board
+        width (int): Number of columns on the board
+
+    Returns:
+        list: A list of lists indexed by [tile][cell]
+    """
+    size = len(goal)
+    table = [[0] * size for _ in range(size)]
+
+    for goal_cell, tile in enumerate(goal):
+        if tile == 0:   # the blank does not count
+            continue
+
+        x2, y2 = divmod(goal_cell, width)
+        for cell in range(size):
+            x1, y1 = divmod(cell, width)
+            table[tile][cell] = abs(x1 - x2) + abs(y1 - y2)
+
+    return table
+
+
+def manhattan_distance(state: list, goal: list, width: int) -> int:
+    """
+    Manhattan distance of a board of any size
+
+    Args:
+        state (list): The current configuration of the board
+        goal (list): The goal configuration of the board
+        width (int): Number of columns on the board
+
+    Returns:
+        int: An integer that represents the distance
+    """
+    table = distance_table(goal, width)
+
+    return sum(table[tile][cell] for cell, tile in enumerate(state))
+
+
+def ida_star(initial_state: list, goal_state: list, width: int) -> list | None:
+    """
+    Implementation of IDA* with the Manhattan distance.
+    The board is changed in place and undone on the way back, and the move
+    that undoes the previous one is never tried, so the memory used is
+    linear in the depth of the solution.
+
+    Args:
+        initial_state (list): The initial configuration of the board
+        goal_state (list): The goal configuration of the board
+        width (int): Number of columns on the board
+
+    Returns:
+        list: The moves applied to reach the goal or None if there is no solution
+    """
+    if not is_solvable(initial_state, goal_state, width):
+        return None
+
+    size = len(initial_state)
+    neighbors = build_neighbors(width, size)
+    table = distance_table(goal_state, width)
+
+    state = list(initial_state)
+    path = []   # moves taken so far
+    h = sum(table[tile][cell] for cell, tile in enumerate(state))
+    bound = h
+
+    def search(g: int, h: int, blank_tile: int, last_move: str | None) -> int:
+        f = g + h
+        if f > bound:
+            return f
+        if h == 0:  # every tile is on its goal cell
+            return FOUND
+
+        minimum = float('inf')  # smallest f that went over the bound
+
+        for move, tile_pos in neighbors[blank_tile]:
+            if move == INVERSE.get(last_move):
+                continue
+
+            # slide the tile into the blank and update h with the moved tile only
+            tile = state[tile_pos]
+            new_h = h + table[tile][blank_tile] - table[tile][tile_pos]
+            state[blank_tile], state[tile_pos] = tile, 0
+            path.append(move)
+
+            result = search(g + 1, new_h, tile_pos, move)
+            if result == FOUND:
+                return FOUND
+
+            # undo the move
+            path.pop()
+            state[blank_tile], state[tile_pos] = 0, tile
+            minimum = min(minimum, result)
+
+        return minimum
+
+    while True:
+        result = search(0, h, state.index(0), None)
+        if result == FOUND:
+            return path
+        bound = result
+
+
+MAX_TABLE_STATES = 40320    # boards up to this many states (8!) get a precomputed successor table
+
+
+@lru_cache(maxsize=None)
+def rank_successors(width: int, size: int, move_order: str) -> tuple:
+    """
+    The successors of every rank, made once per board shape and move order,
+    so a search does no ranking or unranking at all
+
+    Args:
+        width (int): Number of columns on the board
+        size (int): Number of cells on the board
+        move_order (str): The order in which the moves are tried
+
+    Returns:
+        tuple: A tuple indexed by rank with ((index of the move, rank of the new board), ...)
+    """
+    neighbors = successor_table(width, size, move_order)
+    table = []
+
+    for rank in range(factorial(size)):
+        state = unrank_permutation(rank, size)
+        blank_tile = state.index(0)
+        next_states = []
+        for move, tile in neighbors[blank_tile]:
+            state[blank_tile], state[tile] = state[tile], 0
+            next_states.append((move_order.index(move), rank_permutation(state)))
+            state[tile], state[blank_tile] = state[blank_tile], 0
+        table.append(tuple(next_states))
+
+    return tuple(table)
+
+
+class SlidingPuzzle:
+    """
+    The puzzle as a problem for frontier_search.frontier_bfs. The boards are
+    numbered with rank_permutation, which is fine for boards of up to 3x3
+    (9! = 362880 ranks). Small boards look their successors up in the table
+    of rank_successors, the bigger ones compute them for every expansion.
+
+    Args:
+        goal_state (list): The goal configuration of the board
+        width (int): Number of columns on the board
+        move_order (str): The order in which the moves are tried
+    """
+
+    def __init__(self, goal_state: list, width: int, move_order: str = "LRDU") -> None:
+        self.goal = rank_permutation(goal_state)
+        self.size = len(goal_state)
+        self.num_states = factorial(self.size)
+        self.actions = move_order
+        self.neighbors = [
+            sorted(((move_order.index(move), tile) for move, tile in moves))
+            for moves in build_neighbors(width, self.size)
+        ]
+        self.table = None
+        if self.num_states <= MAX_TABLE_STATES:
+            self.table = rank_successors(width, self.size, move_order)
+
+    def encode(self, state: list) -> int:
+        return rank_permutation(state)
+
+    def decode(self, rank: int) -> list:
+        return unrank_permutation(rank, self.size)
+
+    def successors(self, rank: int) -> list:
+        if self.table is not None:
+            return self.table[rank]
+
+        state = unrank_permutation(rank, self.size)
+        blank_tile = state.index(0)
+        next_states = []
+
+        for action, tile in self.neighbors[blank_tile]:
+            state[blank_tile], state[tile] = state[tile], 0
+            next_states.append((action, rank_permutation(state)))
+            state[tile], state[blank_tile] = state[blank_tile], 0
+
+        return next_states
+
+    def is_goal(self, rank: int) -> bool:
+        return rank == self.goal
+
+
+def user_input(prompt: str, size: int) -> list:
+    """
+    Receives user input and cleans away all delimiters and whitespaces
+
+    Args:
+        prompt (str): Prompt given to user
+        size (int): Number of cells on the board
+
+    Returns:
+        list: A list of unique integers between 0 and size - 1
+    """
+    while True:
+        try:
+            raw = input(prompt)
+            state = list(map(int, raw.replace(",", " ").split()))
+
+            if len(state) != size:
+                raise ValueError(f"Enter {size} integers exactly.")
+            if set(state) != set(range(size)):
+                raise ValueError(f"Enter integers between 0 and {size - 1}, no duplicates allowed.")
+            return state
+        except ValueError as e:
+            print(f"Invalid input: {e}")
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Sliding tile puzzle of any size solved with IDA*")
+    parser.add_argument("--width", type=int, default=4, help="number of columns (default: 4)")
+    parser.add_argument("--height", type=int, default=4, help="number of rows (default: 4)")
+    args = parser.parse_args()
+
+    size = args.width * args.height
+    example = ",".join(map(str, list(range(1, size)) + [0]))
+
+    while True:
+        initial_state = user_input(f"Enter the start state (e.g. {example}):", size)
+        goal_state = user_input(f"Enter the goal state (e.g. {example}):", size)
+
+        starttime = timeit.default_timer()
+        print("============================================")
+        result = ida_star(initial_state, goal_state, args.width)
+
+        if result is None:
+            print("No solution.")
+        else:
+            print("Sequence of moves (IDA*):", end=" ")
+            print(*result)
+            print(f"No. of steps: {len(result)}\n")
+
+        print("Time taken:", timeit.default_timer() - starttime)
+        print("============================================")
+
+        if input("\nSolve another board? [y/n] ").strip().lower() != "y":
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Cache of solved sliding tile puzzles, shared by the solvers of bejleri_3_1 and bejleri_3_2,
+so a board that was already solved is not searched again.
+
+A query is stored under its canonical form: the tiles are relabeled so that the
+goal reads 1, 2, 3, ... row by row (the blank stays 0). The moves only depend on
+where the tiles have to go, not on their numbers, so all the queries that are the
+same up to the labels share one entry. The key also holds the name of the solver,
+since two solvers can give different (but equally valid) answers.
+
+The most recently used entries are kept in memory (LRU). If a path is given they are
+also written to a SQLite file, so the cache survives restarts and is shared between processes.
+"""
+
+import sqlite3
+from collections import OrderedDict
+
+from bejleri_3.sliding_puzzle import rank_permutation
+
+
+def canonical(start: list, goal: list) -> tuple:
+    """
+    Relabel the tiles so the goal reads 1, 2, 3, ... row by row, with the blank where it was
+
+    Args:
+        start (list): The initial configuration of the board
+        goal (list): The goal configuration of the board
+
+    Returns:
+        tuple: (the relabeled start, the cell of the blank in the goal)
+    """
+    label = [0] * len(goal)
+    for cell, tile in enumerate(goal):
+        if tile != 0:
+            label[tile] = cell + 1
+
+    return [label[tile] for tile in start], goal.index(0)
+
+
+class SolutionCache:
+    """
+    LRU cache of solutions, optionally backed by a SQLite file
+
+    Args:
+        max_entries (int): The most solutions kept in memory
+        path (str): A SQLite file to also keep every solution in, or None
+    """
+
+    def __init__(self, max_entries: int = 4096, path: str | None = None) -> None:
+        if max_entries < 1:
+            raise ValueError("The cache must hold at least 1 entry")
+
+        self.max_entries = max_entries
+        self.entries = OrderedDict()    # key -> moves, the most recently used last
+        self.hits = 0
+        self.misses = 0
+        self.last_hit = False   # whether the last call of solve was answered by the cache
+
+        self.db = None
+        if path is not None:
+            # several worker processes can share the file, WAL lets them read while one writes
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, moves TEXT)")
+            self.db.commit()
+
+    def key(self, solver: str, start: list, goal: list, width: int) -> str:
+        """
+        The key of a query
+
+        Args:
+            solver (str): Name of the solver, e.g. "bfs" or "a_star/manhattan_distance"
+            start (list): The initial configuration of the board
+            goal (list): The goal configuration of the board
+            width (int): Number of columns on the board
+
+        Returns:
+            str: The key
+        """
+        relabeled, blank_tile = canonical(start, goal)
+
+        return f"{solver}/{width}x{len(goal) // width}/{blank_tile}/{rank_permutation(relabeled)}"
+
+    def get(self, key: str) -> tuple:
+        """
+        Look a key up in memory, then in the file
+
+        Args:
+            key (str): The key of the query
+
+        Returns:
+            tuple: (True, moves as a tuple or None) if the key is cached, else (False, None)
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return True, self.entries[key]
+
+        if self.db is not None:
+            row = self.db.execute("SELECT moves FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                moves = None if row[0] is None else tuple(row[0])  # every move is one letter
+                self.remember(key, moves)
+                return True, moves
+
+        return False, None
+
+    def put(self, key: str, moves: list | None) -> None:
+        """
+        Cache the solution of a query
+
+        Args:
+            key (str): The key of the query
+            moves (list): The moves of the solution, None if there is no solution
+        """
+        self.remember(key, None if moves is None else tuple(moves))
+
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)",
+                            (key, None if moves is None else "".join(moves)))
+            self.db.commit()
+
+    def remember(self, key: str, moves: list | None) -> None:
+        # keep the entry in memory and drop the least recently used one if it is full
+        self.entries[key] = moves
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def solve(self, solver: str, function, start: list, goal: list, width: int, *args, **kwargs) -> list | None:
+        """
+        Answer a query from the cache, or solve it with function(start, goal, *args, **kwargs)
+        and cache the result
+
+        Args:
+            solver (str): Name of the solver, part of the key. It must change when the
+                          arguments change the answer (e.g. a depth limit)
+            function: The solver
+            start (list): The initial configuration of the board
+            goal (list): The goal configuration of the board
+            width (int): Number of columns on the board
+
+        Returns:
+            list: The moves of the solution or None if there is no solution
+        """
+        key = self.key(solver, start, goal, width)
+        found, moves = self.get(key)
+        self.last_hit = found
+
+        if found:
+            self.hits += 1
+            return None if moves is None else list(moves)
+
+        self.misses += 1
+        moves = function(start, goal, *args, **kwargs)
+        self.put(key, moves)
+
+        return moves
+
+    def close(self) -> None:
+        """Close the SQLite file"""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
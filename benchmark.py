@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+
+"""
+Reproducible benchmark of the search solvers of this repo.
+
+For every puzzle it makes random start states at exact solution depths from a seed
+(a BFS from the goal gives the states of each depth, then the seed picks among them),
+runs every solver on them and reports for each solver and depth:
+*throughput (solves per second)
+*latency percentiles (p50, p90, p99, max)
+*nodes expanded and nodes expanded per second (for the solvers that report them)
+*peak memory (every solver runs in a freshly spawned process, so the peak is the one of the
+ interpreter, the modules of this repo and that solver, not of the benchmark itself)
+
+The results are printed as a table and can be saved as JSON (--output) to compare commits.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource     # not available on Windows
+except ImportError:
+    resource = None
+
+from bejleri_3 import bejleri_3_1, bejleri_3_2, sliding_puzzle
+from PA2 import q1
+from search_stats import SearchStats
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+FIVE_TILE_GOAL = [1, 2, 3, 4, 5, 0]
+EIGHT_PUZZLE_GOAL = [1, 2, 3, 4, 5, 6, 7, 8, 0]
+TRANSPORT_GOAL = (0, 0, 'R')
+
+
+def tile_layer(goal: list, width: int, depth: int) -> list:
+    """
+    The boards that are exactly depth moves away from the goal
+
+    Args:
+        goal (list): The goal configuration of the board
+        width (int): Number of columns on the board
+        depth (int): The solution depth
+
+    Returns:
+        list: A sorted list of boards (as tuples)
+    """
+    neighbors = sliding_puzzle.build_neighbors(width, len(goal))
+    seen = {tuple(goal)}
+    layer = [tuple(goal)]
+
+    for _ in range(depth):
+        next_layer = []
+        for state in layer:
+            blank_tile = state.index(0)
+            for _, tile in neighbors[blank_tile]:
+                new_state = list(state)
+                new_state[blank_tile], new_state[tile] = new_state[tile], 0
+                new_state = tuple(new_state)
+                if new_state not in seen:
+                    seen.add(new_state)
+                    next_layer.append(new_state)
+        layer = next_layer
+
+    return sorted(layer)
+
+
+def transport_layer(transport: q1.Transport, depth: int) -> list:
+    """
+    The states of the transport puzzle that are exactly depth crossings away from the goal
+
+    Args:
+        transport (Transport): The puzzle
+        depth (int): The solution depth
+
+    Returns:
+        list: A sorted list of encoded states
+    """
+    goal = transport.encode(TRANSPORT_GOAL)
+    seen = {goal}
+    layer = [goal]
+
+    for _ in range(depth):
+        next_layer = []
+        for code in layer:
+            for _, next_code in transport.successors(code):
+                if next_code not in seen:
+                    seen.add(next_code)
+                    next_layer.append(next_code)
+        layer = next_layer
+
+    return sorted(layer)
+
+
+def make_instances(puzzle: str, depth: int, count: int, seed: int, transport: tuple) -> list:
+    """
+    Pick count start states at the given depth, the same ones for the same seed
+
+    Args:
+        puzzle (str): "5-tile", "8-puzzle" or "transport"
+        depth (int): The solution depth
+        count (int): Number of instances
+        seed (int): Seed of the random generator
+        transport (tuple): (thalassians, voridians, capacity) of the transport puzzle
+
+    Returns:
+        list: The start states (empty if no state has that depth)
+    """
+    rng = random.Random(f"{seed}/{puzzle}/{depth}")
+
+    if puzzle == "5-tile":
+        layer = tile_layer(FIVE_TILE_GOAL, 3, depth)
+        return [list(rng.choice(layer)) for _ in range(count)] if layer else []
+    if puzzle == "8-puzzle":
+        layer = tile_layer(EIGHT_PUZZLE_GOAL, 3, depth)
+        return [list(rng.choice(layer)) for _ in range(count)] if layer else []
+
+    problem = q1.Transport(*transport)
+    layer = transport_layer(problem, depth)
+    return [problem.decode(rng.choice(layer)) for _ in range(count)] if layer else []
+
+
+def solve(solver: str, start, transport: tuple, stats: SearchStats | None):
+    """
+    Run one solver on one start state
+
+    Args:
+        solver (str): Name of the solver, a key of SOLVERS
+        start: The start state
+        transport (tuple): (thalassians, voridians, capacity) of the transport puzzle
+        stats (SearchStats): Filled in by the solvers that support it, or None
+
+    Returns:
+        list: The solution or None
+    """
+    if solver == "bfs":
+        return bejleri_3_1.bfs(start, FIVE_TILE_GOAL, stats=stats)
+    if solver == "ids":
+        return bejleri_3_1.ids(start, FIVE_TILE_GOAL, stats=stats)
+    if solver == "bidirectional_bfs":
+        return bejleri_3_1.bidirectional_bfs(start, FIVE_TILE_GOAL)
+    if solver.startswith("a_star_"):
+        # a_star_<name of the heuristic in the registry>
+        return bejleri_3_2.a_star(start, EIGHT_PUZZLE_GOAL, solver[len("a_star_"):], stats=stats)
+    if solver == "ida_star":
+        return sliding_puzzle.ida_star(start, EIGHT_PUZZLE_GOAL, 3)
+    if solver == "transport_bfs":
+        return q1.Transport(*transport).solve(start, TRANSPORT_GOAL, stats=stats)
+    if solver == "transport_layers":
+        return q1.Transport(*transport).solve_layers(start, TRANSPORT_GOAL)
+
+    raise ValueError(f"Unknown solver: {solver}")
+
+
+# the solvers run on each puzzle
+SOLVERS = {
+    "5-tile": ["bfs", "ids", "bidirectional_bfs"],
+    "8-puzzle": [f"a_star_{name}" for name in bejleri_3_2.HEURISTICS] + ["ida_star"],
+    "transport": ["transport_bfs", "transport_layers"],
+}
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Nearest rank percentile
+
+    Args:
+        values (list): The values, sorted
+        fraction (float): e.g. 0.9 for the 90th percentile
+
+    Returns:
+        float: The percentile
+    """
+    index = max(0, min(len(values) - 1, math.ceil(fraction * len(values)) - 1))
+
+    return values[index]
+
+
+def run_solver(solver: str, instances: list, transport: tuple) -> dict:
+    """
+    Run one solver on all the instances of one depth. It runs in a freshly
+    spawned process, so the peak memory is the one of that process (the interpreter,
+    the modules of this repo and this solver), not the one of the benchmark.
+
+    Args:
+        solver (str): Name of the solver
+        instances (list): The start states
+        transport (tuple): (thalassians, voridians, capacity) of the transport puzzle
+
+    Returns:
+        dict: The results
+    """
+    latencies = []
+    nodes_expanded = 0
+    solved = 0
+
+    # one untimed run first, so loading pattern databases or NumPy is not counted
+    solve(solver, instances[0], transport, None)
+
+    # the timed runs have no stats, the timers of SearchStats would slow the solvers down
+    for start in instances:
+        started = time.perf_counter()
+        result = solve(solver, start, transport, None)
+        latencies.append(time.perf_counter() - started)
+        solved += result is not None
+
+    # the nodes are counted in a second pass that is not timed
+    for start in instances:
+        stats = SearchStats(solver)
+        solve(solver, start, transport, stats)
+        nodes_expanded += stats.nodes_expanded
+
+    total_time = sum(latencies)
+    latencies.sort()
+
+    return {
+        "instances": len(instances),
+        "solved": solved,
+        "total_time": total_time,
+        "throughput": len(instances) / total_time if total_time else None,
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p90": percentile(latencies, 0.9),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": latencies[-1],
+        # solvers without stats leave the counters at 0
+        "nodes_expanded": nodes_expanded or None,
+        "nodes_per_sec": nodes_expanded / total_time if nodes_expanded and total_time else None,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+    }
+
+
+def git_commit() -> str | None:
+    """
+    Returns:
+        str: The commit the benchmark runs on, or None if it is not known
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_depths(raw: str) -> list:
+    """Turn "5,10,15" into [5, 10, 15]"""
+    return [int(depth) for depth in raw.split(",") if depth.strip()]
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Benchmark the search solvers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=20, help="instances per depth")
+    parser.add_argument("--five-tile-depths", type=parse_depths, default=[5, 10, 15, 20])
+    parser.add_argument("--eight-puzzle-depths", type=parse_depths, default=[8, 14, 20])
+    parser.add_argument("--transport-depths", type=parse_depths, default=[5, 11])
+    parser.add_argument("--transport", type=int, nargs=3, default=[3, 3, 2],
+                        metavar=("THALASSIANS", "VORIDIANS", "CAPACITY"))
+    parser.add_argument("--solvers", help="comma separated solvers to run (default: all)")
+    parser.add_argument("--output", help="save the results as JSON to this file")
+    args = parser.parse_args()
+
+    depths = {
+        "5-tile": args.five_tile_depths,
+        "8-puzzle": args.eight_puzzle_depths,
+        "transport": args.transport_depths,
+    }
+    wanted = args.solvers.split(",") if args.solvers else None
+    transport = tuple(args.transport)
+    results = []
+
+    print(f"{'puzzle':<10} {'solver':<18} {'depth':>5} {'solves/s':>10} {'p50 ms':>9} "
+          f"{'p99 ms':>9} {'nodes/s':>10} {'rss MB':>7}")
+
+    for puzzle, solvers in SOLVERS.items():
+        for depth in depths[puzzle]:
+            instances = make_instances(puzzle, depth, args.count, args.seed, transport)
+            if not instances:
+                print(f"{puzzle:<10} no state at depth {depth}, skipped")
+                continue
+
+            for solver in solvers:
+                if wanted is not None and solver not in wanted:
+                    continue
+
+                # a fresh process per solver, so the peak memory is not shared. It is spawned, not
+                # forked: a forked child starts with the peak of this process (e.g. the 8-puzzle layers)
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    result = executor.submit(run_solver, solver, instances, transport).result()
+
+                result.update(puzzle=puzzle, solver=solver, depth=depth)
+                results.append(result)
+
+                nodes_per_sec = f"{result['nodes_per_sec']:.0f}" if result["nodes_per_sec"] else "-"
+                rss = f"{result['peak_rss_kb'] / 1024:.1f}" if result["peak_rss_kb"] else "-"
+                print(f"{puzzle:<10} {solver:<18} {depth:>5} {result['throughput']:>10.1f} "
+                      f"{result['latency_p50'] * 1000:>9.2f} {result['latency_p99'] * 1000:>9.2f} "
+                      f"{nodes_per_sec:>10} {rss:>7}")
+
+    if args.output is not None:
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "count": args.count,
+            "transport": transport,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Layer by layer Breadth First Search shared by the puzzles of this repo
+(bejleri_3 sliding tile puzzles and the PA2 transport puzzle).
+
+The search works on a problem object with:
+*num_states: the number of states, every state has a rank in range(num_states)
+*actions: the names of the actions
+*encode(state) -> int: the rank of a state
+*decode(rank) -> state: the state with that rank
+*successors(rank) -> list: (index of the action in actions, rank of the new state) pairs
+*is_goal(rank) -> bool: True if the state is a goal
+
+Each layer is kept in a compact array of ranks, the visited states in a
+bytearray indexed by rank and the way back to the start in flat arrays
+of parent ranks and action indexes, so no Python set or dict of states is needed.
+Big layers can be expanded by several processes at once.
+"""
+
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+worker_problem = None   # the problem of a worker process, set once by set_worker_problem
+
+
+def set_worker_problem(problem) -> None:
+    """
+    Initializer of the worker processes, so the problem is sent once per worker
+
+    Args:
+        problem: The problem to search
+    """
+    global worker_problem
+    worker_problem = problem
+
+
+def action_typecode(num_actions: int) -> str:
+    """
+    Smallest array typecode that can hold the index of every action
+
+    Args:
+        num_actions (int): Number of actions of the problem
+
+    Returns:
+        str: 'B', 'H' or 'I'
+    """
+    if num_actions <= 0x100:
+        return 'B'
+    if num_actions <= 0x10000:
+        return 'H'
+    return 'I'
+
+
+def expand_chunk(chunk: array) -> tuple:
+    """
+    Expand a part of a layer in a worker process. The result is sent back
+    as flat arrays, which are much cheaper to pass between processes than tuples.
+
+    Args:
+        chunk (array): The ranks of the states to expand
+
+    Returns:
+        tuple: (ranks of the parents, indexes of the actions, ranks of the children)
+    """
+    parents = array('q')
+    actions = array(action_typecode(len(worker_problem.actions)))
+    children = array('q')
+
+    for parent in chunk:
+        for action, child in worker_problem.successors(parent):
+            parents.append(parent)
+            actions.append(action)
+            children.append(child)
+
+    return parents, actions, children
+
+
+def frontier_bfs(problem, start_state, workers: int = 1, min_parallel_layer: int = 4096,
+                 stats=None) -> list | None:
+    """
+    Breadth First Search one layer at a time
+
+    Args:
+        problem: The problem to search (see the top of this file)
+        start_state: The starting state, as problem.decode returns them
+        workers (int): Number of processes that expand the layers
+        min_parallel_layer (int): Layers smaller than this are expanded in this process
+        stats (SearchStats): If given, it is filled in with the counters and timers of the search
+
+    Returns:
+        list: The path from the start to the closest goal as (action, state) pairs,
+              the first pair is (None, start_state). None if no goal can be reached
+    """
+    start = problem.encode(start_state)
+
+    visited = bytearray(problem.num_states)
+    parents = array('q', [-1]) * problem.num_states
+    parent_actions = array(action_typecode(len(problem.actions)), [0]) * problem.num_states
+
+    visited[start] = 1
+    frontier = array('q', [start])
+    goal = start if problem.is_goal(start) else None
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=set_worker_problem,
+                                       initargs=(problem,))
+
+    successors = problem.successors
+    is_goal = problem.is_goal
+    num_visited = 1
+
+    if stats is not None:
+        def successors(rank: int, successors=problem.successors) -> list:
+            # time the expansion, the rest of the layer is spent on the queue and visited states
+            started = time.perf_counter()
+            children = successors(rank)
+            stats.expansion_time += time.perf_counter() - started
+            return children
+
+    try:
+        while frontier and goal is None:
+            layer_started = time.perf_counter()
+            expansion_before = stats.expansion_time if stats is not None else 0.0
+
+            if executor is not None and len(frontier) >= min_parallel_layer:
+                size = -(-len(frontier) // workers)
+                chunks = [frontier[i:i + size] for i in range(0, len(frontier), size)]
+                parts = list(executor.map(expand_chunk, chunks))
+                if stats is not None:
+                    stats.expansion_time += time.perf_counter() - layer_started
+
+                # the chunks come back in order, so the result is the same as with one process
+                expanded = (
+                    (parent, [(action, child)])
+                    for part in parts
+                    for parent, action, child in zip(*part)
+                )
+            else:
+                expanded = ((parent, successors(parent)) for parent in frontier)
+
+            next_frontier = array('q')
+
+            for parent, children in expanded:
+                for action, child in children:
+                    if visited[child]:
+                        if stats is not None:
+                            stats.duplicates += 1
+                        continue
+
+                    visited[child] = 1
+                    num_visited += 1
+                    parents[child] = parent
+                    parent_actions[child] = action
+                    next_frontier.append(child)
+
+                    if is_goal(child):
+                        goal = child
+                        break
+
+                if goal is not None:
+                    break
+
+            if stats is not None:
+                stats.nodes_expanded += len(frontier)
+                stats.frontier(len(frontier) + len(next_frontier))
+                stats.closed(num_visited)
+                stats.queue_time += (time.perf_counter() - layer_started) - (stats.expansion_time - expansion_before)
+
+            frontier = next_frontier
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if stats is not None:
+        stats.nodes_generated = num_visited - 1 + stats.duplicates
+        stats.finish()
+
+    if goal is None:
+        return None
+
+    path = []
+    rank = goal
+    while rank != start:
+        path.append((problem.actions[parent_actions[rank]], problem.decode(rank)))
+        rank = parents[rank]
+    path.append((None, start_state))
+
+    return list(reversed(path))
@@ -0,0 +1,102 @@
+"""
+Counters and timers filled in by the solvers of this repo, so solvers and
+heuristics can be compared on the same workload.
+
+A solver that is given a SearchStats counts the nodes it expands and generates,
+the duplicates it drops, the biggest its frontier and closed set got and the
+time it spent on the heuristic, on expanding nodes and on its queue. When the
+search is over it calls finish(), which adds the total time and the peak memory
+of the process and writes the stats as one JSON line if a sink was given.
+"""
+
+import json
+import time
+
+try:
+    import resource     # not available on Windows
+except ImportError:
+    resource = None
+
+
+class SearchStats:
+    """
+    Statistics of one search
+
+    Args:
+        solver (str): Name of the solver, written with the stats
+        sink: A path or an open text file to append the stats to as a JSON line, or None
+    """
+
+    def __init__(self, solver: str = "", sink=None) -> None:
+        self.solver = solver
+        self.sink = sink
+
+        self.nodes_expanded = 0     # nodes whose successors were generated
+        self.nodes_generated = 0    # successors generated
+        self.duplicates = 0         # successors dropped because they were already seen
+        self.peak_frontier = 0      # biggest size of the frontier (fringe, stack or open list)
+        self.peak_closed = 0        # biggest number of states kept as seen/closed
+        self.peak_rss_kb = 0        # peak memory of the whole process, in KB
+        self.evictions = 0          # nodes dropped by a memory bounded search to stay in its budget
+        self.fell_back = False      # the solver hit its memory budget and switched to its bounded mode
+
+        self.heuristic_time = 0.0   # seconds spent evaluating the heuristic
+        self.expansion_time = 0.0   # seconds spent generating successors
+        self.queue_time = 0.0       # seconds spent on the frontier and the seen/closed set
+        self.total_time = 0.0
+
+        self.start_time = time.perf_counter()
+
+    def frontier(self, size: int) -> None:
+        """Record the current size of the frontier"""
+        if size > self.peak_frontier:
+            self.peak_frontier = size
+
+    def closed(self, size: int) -> None:
+        """Record the current size of the seen/closed set"""
+        if size > self.peak_closed:
+            self.peak_closed = size
+
+    def finish(self) -> None:
+        """
+        Record the total time and the peak memory and write the stats to the sink
+        """
+        self.total_time = time.perf_counter() - self.start_time
+
+        if resource is not None:
+            self.peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        if self.sink is None:
+            return
+
+        line = json.dumps(self.to_dict()) + "\n"
+        if isinstance(self.sink, str):
+            with open(self.sink, "a") as file:
+                file.write(line)
+        else:
+            self.sink.write(line)
+            self.sink.flush()
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: The stats as a dictionary
+        """
+        return {
+            "solver": self.solver,
+            "nodes_expanded": self.nodes_expanded,
+            "nodes_generated": self.nodes_generated,
+            "duplicates": self.duplicates,
+            "peak_frontier": self.peak_frontier,
+            "peak_closed": self.peak_closed,
+            "peak_rss_kb": self.peak_rss_kb,
+            "evictions": self.evictions,
+            "fell_back": self.fell_back,
+            "heuristic_time": self.heuristic_time,
+            "expansion_time": self.expansion_time,
+            "queue_time": self.queue_time,
+            "total_time": self.total_time,
+        }
+
+    def __str__(self) -> str:
+        return "\n".join(f"{key}: {value}" for key, value in self.to_dict().items())
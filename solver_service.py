@@ -0,0 +1,487 @@
+#!/usr/bin/env python
+
+"""
+Long running solver service for the puzzles of this repo, so a caller does not
+start a new Python process (and load the tables again) for every board.
+
+It listens on a Unix socket (--socket) or on localhost TCP (--port) and speaks
+JSON lines: every line a client sends is a request, every line it gets back is
+the answer to one of them, in the order they finish (the id tells them apart).
+
+A request looks like
+    {"id": 1, "puzzle": "8-puzzle", "start": [8, 6, 7, 2, 5, 4, 3, 0, 1], "heuristic": "pdb", "deadline": 2.5}
+with the fields
+*puzzle: "5-tile", "8-puzzle" or "transport"
+*start, goal: the boards (the goal is the tiles in order by default), or the
+ (thal_left, vors_left, side) states of the transport puzzle (everyone moves to Zenithia by default)
+*solver: "table" (default), "bfs", "ids" or "bidirectional_bfs" for the 5-tile puzzle
+*heuristic, weight, max_nodes: the options of a_star for the 8-puzzle
+*transport: [thalassians, voridians, capacity] of the transport puzzle (default [3, 3, 2])
+*deadline: seconds the client waits at most (the service caps it at --deadline)
+
+and the answer is
+    {"id": 1, "ok": true, "moves": [...], "cached": false, "coalesced": false, "seconds": 0.41}
+or {"id": 1, "ok": false, "error": "..."}. moves is null if there is no solution.
+
+*the answers of the tile puzzles are kept in a SolutionCache (and in a SQLite file with --cache)
+*identical requests that arrive while one is being solved wait for the same search
+*the searches run in worker processes, which keep their pattern databases and solution tables loaded
+*a search nobody waits for anymore (every request for it is past its deadline) is
+ cancelled by killing its worker, and a fresh worker takes its place
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+
+from bejleri_3 import bejleri_3_1, bejleri_3_2
+from bejleri_3.solution_cache import SolutionCache
+from PA2 import q1
+
+FIVE_TILE_GOAL = [1, 2, 3, 4, 5, 0]
+EIGHT_PUZZLE_GOAL = [1, 2, 3, 4, 5, 6, 7, 8, 0]
+TRANSPORT_GOAL = (0, 0, 'R')
+FIVE_TILE_SOLVERS = ("table", "bfs", "ids", "bidirectional_bfs")
+DEFAULT_DEADLINE = 10.0     # seconds, also the most a request can ask for
+MAX_LINE = 1 << 16          # longest request line accepted, in bytes
+
+solution_tables = {}    # goal -> the solution table of bejleri_3_1, loaded once per worker
+
+
+def board(raw, size: int, name: str) -> list:
+    """
+    Check that a board of a request holds the tiles 0 to size - 1 once each
+
+    Args:
+        raw: The board as it came in the request
+        size (int): Number of cells on the board
+        name (str): "start" or "goal", for the error message
+
+    Returns:
+        list: The board
+    """
+    # type() and not isinstance(), so true and false are not taken for 1 and 0
+    if not (isinstance(raw, list) and len(raw) == size and all(type(tile) is int for tile in raw)
+            and sorted(raw) == list(range(size))):
+        raise ValueError(f"{name} must be a list with the integers 0 to {size - 1} once each")
+
+    return raw
+
+
+def parse_request(request: dict) -> tuple:
+    """
+    Check a request and turn it into a job for the workers
+
+    Args:
+        request (dict): The decoded JSON line
+
+    Returns:
+        tuple: (key shared by all the requests with the same answer, job, width of the board or None)
+    """
+    puzzle = request.get("puzzle")
+
+    if puzzle == "5-tile":
+        start = board(request.get("start"), 6, "start")
+        goal = board(request.get("goal", FIVE_TILE_GOAL), 6, "goal")
+        solver = request.get("solver", "table")
+        if solver not in FIVE_TILE_SOLVERS:
+            raise ValueError(f"solver must be one of {', '.join(FIVE_TILE_SOLVERS)}")
+        job = {"puzzle": puzzle, "start": start, "goal": goal, "solver": solver}
+        return f"5-tile/{solver}", job, bejleri_3_1.WIDTH
+
+    if puzzle == "8-puzzle":
+        start = board(request.get("start"), 9, "start")
+        goal = board(request.get("goal", EIGHT_PUZZLE_GOAL), 9, "goal")
+        heuristic = request.get("heuristic", "md")
+        if heuristic not in bejleri_3_2.HEURISTICS:
+            raise ValueError(f"heuristic must be one of {', '.join(bejleri_3_2.HEURISTICS)}")
+        weight = request.get("weight", 1)
+        max_nodes = request.get("max_nodes")
+        # type() as in board(), so true is not taken for a weight of 1
+        if type(weight) not in (int, float) or weight < 1:
+            raise ValueError("weight must be a number of at least 1")
+        if max_nodes is not None and (type(max_nodes) is not int or max_nodes < 1):
+            raise ValueError("max_nodes must be a positive integer")
+        job = {"puzzle": puzzle, "start": start, "goal": goal, "heuristic": heuristic,
+               "weight": weight, "max_nodes": max_nodes}
+        # the same name as solve_one, so a --cache file is shared with the batch mode of bejleri_3_2
+        function = bejleri_3_2.HEURISTICS[heuristic].function
+        return f"a_star/{function.__name__}/w{weight:g}/n{max_nodes}", job, bejleri_3_2.WIDTH
+
+    if puzzle == "transport":
+        params = request.get("transport", [3, 3, 2])
+        if not (isinstance(params, list) and len(params) == 3 and all(type(n) is int and n >= 0 for n in params)):
+            raise ValueError("transport must be [thalassians, voridians, capacity]")
+        thalassians, voridians, _ = params
+        states = []
+        for name, default in (("start", [thalassians, voridians, 'L']), ("goal", list(TRANSPORT_GOAL))):
+            state = request.get(name, default)
+            if not (isinstance(state, list) and len(state) == 3 and type(state[0]) is int and type(state[1]) is int
+                    and 0 <= state[0] <= thalassians and 0 <= state[1] <= voridians and state[2] in ("L", "R")):
+                raise ValueError(f"{name} must be [thal_left, vors_left, \"L\" or \"R\"]")
+            states.append(state)
+        job = {"puzzle": puzzle, "start": states[0], "goal": states[1], "transport": params}
+        return f"transport/{json.dumps(job, sort_keys=True)}", job, None
+
+    raise ValueError("puzzle must be one of 5-tile, 8-puzzle, transport")
+
+
+def solve_job(job: dict) -> list | None:
+    """
+    Solve a job in a worker process
+
+    Args:
+        job (dict): A job made by parse_request
+
+    Returns:
+        list: The moves (the states for the transport puzzle) or None if there is no solution
+    """
+    start, goal = job["start"], job["goal"]
+
+    if job["puzzle"] == "5-tile":
+        if job["solver"] == "table":
+            key = tuple(goal)
+            if key not in solution_tables:
+                solution_tables[key] = bejleri_3_1.load_solution_table(goal)
+            return bejleri_3_1.table_solve(solution_tables[key], start)
+        if job["solver"] == "bfs":
+            return bejleri_3_1.bfs(start, goal)
+        if job["solver"] == "ids":
+            return bejleri_3_1.ids(start, goal)
+        return bejleri_3_1.bidirectional_bfs(start, goal)
+
+    if job["puzzle"] == "8-puzzle":
+        moves, _ = bejleri_3_2.solve_one(start, goal, job["heuristic"], weight=job["weight"],
+                                         max_nodes=job["max_nodes"])
+        return moves
+
+    path = q1.Transport(*job["transport"]).solve(tuple(start), tuple(goal))
+    return None if path is None else [list(state) for state in path]
+
+
+def worker_loop(connection) -> None:
+    """
+    Body of a worker process: solve the jobs that come through the pipe, one at a time
+
+    Args:
+        connection: The worker end of the pipe
+    """
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:    # the service is gone
+            return
+        try:
+            connection.send((True, solve_job(job)))
+        except Exception as error:
+            connection.send((False, f"{type(error).__name__}: {error}"))
+
+
+class Worker:
+    """
+    A worker process and the service end of its pipe
+    """
+
+    def __init__(self) -> None:
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_loop, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class WorkerPool:
+    """
+    Worker processes that can be stopped in the middle of a search, which
+    concurrent.futures.ProcessPoolExecutor can't do: a cancelled job kills
+    its worker and a new one is started in its place.
+
+    Args:
+        workers (int): Number of worker processes
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = [Worker() for _ in range(workers)]
+        self.idle = asyncio.Queue()
+        for worker in self.workers:
+            self.idle.put_nowait(worker)
+        self.restarts = 0
+
+    async def run(self, job: dict):
+        """
+        Run a job on the first free worker
+
+        Args:
+            job (dict): A job made by parse_request
+
+        Returns:
+            The answer of solve_job, raises RuntimeError if it failed
+        """
+        worker = await self.idle.get()
+        loop = asyncio.get_running_loop()
+        answer = loop.create_future()
+
+        dead = False
+
+        def readable() -> None:
+            nonlocal dead
+            loop.remove_reader(worker.connection.fileno())
+            try:
+                result = worker.connection.recv()
+            except (EOFError, OSError) as error:    # the worker died
+                dead = True
+                result = (False, f"the worker stopped: {error!r}")
+            if not answer.done():
+                answer.set_result(result)
+
+        try:
+            worker.connection.send(job)
+        except OSError as error:    # the worker died while it was idle
+            self.replace(worker)
+            raise RuntimeError(f"the worker stopped: {error!r}") from error
+        loop.add_reader(worker.connection.fileno(), readable)
+
+        try:
+            ok, result = await answer
+        except asyncio.CancelledError:
+            # nobody wants the answer anymore: stop the search with its worker
+            loop.remove_reader(worker.connection.fileno())
+            self.replace(worker)
+            raise
+
+        if dead:
+            # is_alive() can still be true for a moment after the pipe broke
+            self.replace(worker)
+        else:
+            self.idle.put_nowait(worker)
+
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def replace(self, worker: Worker) -> None:
+        # kill a worker and put a new one in the pool
+        worker.kill()
+        self.workers.remove(worker)
+        fresh = Worker()
+        self.workers.append(fresh)
+        self.idle.put_nowait(fresh)
+        self.restarts += 1
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.kill()
+
+
+class SolverService:
+    """
+    Answers the requests: the cache first, then a search that is already running
+    for the same key, then a new search on the pool
+
+    Args:
+        workers (int): Number of worker processes
+        cache_path (str): If given, the tile puzzle answers are also kept in this SQLite file
+        max_deadline (float): The longest a request may wait, in seconds
+    """
+
+    def __init__(self, workers: int, cache_path: str | None = None, max_deadline: float = DEFAULT_DEADLINE) -> None:
+        self.pool = WorkerPool(workers)
+        self.cache = SolutionCache(path=cache_path)
+        self.max_deadline = max_deadline
+        self.in_flight = {}     # key -> [task of the search, number of requests waiting for it]
+        self.requests = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    async def search(self, key: str, job: dict, cache_key: str | None):
+        # one search for all the requests with this key, cached when it is done
+        try:
+            moves = await self.pool.run(job)
+            if cache_key is not None:
+                self.cache.put(cache_key, moves)
+            return moves
+        finally:
+            # only its own entry: a cancelled search was already replaced by a new one for the same key
+            if self.in_flight.get(key, [None])[0] is asyncio.current_task():
+                del self.in_flight[key]
+
+    async def answer(self, request: dict) -> dict:
+        """
+        Answer one request
+
+        Args:
+            request (dict): The decoded JSON line
+
+        Returns:
+            dict: The answer, without the id
+        """
+        started = time.perf_counter()
+        self.requests += 1
+
+        key, job, width = parse_request(request)
+        deadline = request.get("deadline", self.max_deadline)
+        if type(deadline) not in (int, float) or deadline <= 0:
+            raise ValueError("deadline must be a positive number of seconds")
+        deadline = min(deadline, self.max_deadline)
+
+        cache_key = None
+        if width is not None:
+            # the key of the cache is the same for boards that only differ by the labels of the tiles,
+            # so the key of the search is that one too
+            cache_key = self.cache.key(key, job["start"], job["goal"], width)
+            found, moves = self.cache.get(cache_key)
+            if found:
+                self.cache.hits += 1
+                return {"ok": True, "moves": None if moves is None else list(moves), "cached": True,
+                        "coalesced": False, "seconds": time.perf_counter() - started}
+            self.cache.misses += 1
+            key = cache_key
+
+        flight = self.in_flight.get(key)
+        coalesced = flight is not None and not flight[0].done()
+        if coalesced:
+            self.coalesced += 1
+            flight[1] += 1
+        else:
+            flight = self.in_flight[key] = [asyncio.create_task(self.search(key, job, cache_key)), 1]
+
+        try:
+            # shield it, so one request giving up does not stop the search the others wait for
+            moves = await asyncio.wait_for(asyncio.shield(flight[0]), deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return {"ok": False, "error": f"deadline of {deadline:g}s exceeded"}
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not flight[0].done():
+                # the last one waiting gave up: the search is forgotten before it is stopped,
+                # so a request for the same key that comes now starts a new one
+                if self.in_flight.get(key) is flight:
+                    del self.in_flight[key]
+                flight[0].cancel()
+
+        # a coalesced tile board may have other labels than the one that was searched,
+        # but it has the same canonical form, so the same moves solve it
+        return {"ok": True, "moves": moves, "cached": False, "coalesced": coalesced,
+                "seconds": time.perf_counter() - started}
+
+    async def respond(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        # answer one line and write the answer back
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+            request_id = request.get("id")
+            answer = await self.answer(request)
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise   # this request itself is stopped, not the search it waited for
+            answer = {"ok": False, "error": "the search was cancelled"}
+        except (ValueError, RuntimeError) as error:
+            answer = {"ok": False, "error": str(error)}
+        except Exception as error:
+            # a bug must not swallow the answer: the client would wait for it forever
+            answer = {"ok": False, "error": f"internal error: {type(error).__name__}: {error}"}
+
+        if not writer.is_closing():
+            writer.write(json.dumps({"id": request_id, **answer}).encode() + b"\n")
+            await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve one client: every line is answered in its own task, so a slow
+        search does not hold back the ones after it
+
+        Args:
+            reader (StreamReader): Lines from the client
+            writer (StreamWriter): Answers to the client
+        """
+        tasks = set()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):   # a line longer than MAX_LINE, or the client went away
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            # the client closed its side, the answers it is still waiting for are sent first
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        self.pool.close()
+        self.cache.close()
+
+
+async def serve(args) -> None:
+    """
+    Run the service until it is interrupted
+
+    Args:
+        args: The parsed command line arguments
+    """
+    service = SolverService(args.workers, cache_path=args.cache, max_deadline=args.deadline)
+
+    if args.socket is not None:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)  # left behind by a service that did not stop cleanly
+        server = await asyncio.start_unix_server(service.handle, path=args.socket, limit=MAX_LINE)
+        where = args.socket
+    else:
+        server = await asyncio.start_server(service.handle, "127.0.0.1", args.port, limit=MAX_LINE)
+        where = f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+    print(f"Listening on {where} with {args.workers} workers", flush=True)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+        if args.socket is not None and os.path.exists(args.socket):
+            os.remove(args.socket)
+        print(f"{service.requests} requests, {service.cache.hits} from the cache, {service.coalesced} coalesced, "
+              f"{service.timeouts} past their deadline, {service.pool.restarts} workers restarted")
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Serve the puzzle solvers over JSON lines")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--socket", help="path of a Unix socket to listen on")
+    where.add_argument("--port", type=int, default=8765, help="localhost TCP port to listen on (default: 8765)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of solver processes")
+    parser.add_argument("--cache", metavar="FILE", help="also keep the tile puzzle answers in the SQLite file FILE")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE,
+                        help=f"longest a request may wait, in seconds (default: {DEFAULT_DEADLINE:g})")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()